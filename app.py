@@ -1,24 +1,255 @@
-!pip install requests beautifulsoup4 fake-useragent lxml pandas
-
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
+import soupsieve
 import time
 import random
-from fake_useragent import UserAgent
 import json
-from urllib.parse import urlencode, urlparse
+import logging
+from urllib.parse import urlencode, urlparse, parse_qsl, urlunparse
 import re
-import pandas as pd
-from datetime import datetime
+import os
+import sys
+import csv
+import zlib
+import copy
+import shutil
+import tempfile
+import math
+import heapq
+import sqlite3
+import hashlib
+import threading
+import queue
+import uuid
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from array import array
+from collections import deque, namedtuple
+from enum import IntEnum
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, jsonify, request, stream_with_context
+from flask_cors import CORS
 
-def get_stealth_headers():
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    from cssselect import HTMLTranslator
+except ImportError:  # lxml / cssselect 未導入の環境では html.parser のみ使用
+    lxml_html = None
+
+SEARCH_URL = "https://www.ebay.com/sch/i.html"
+
+# 進捗・デバッグ出力用のロガー（main() では INFO 以上を表示）
+logger = logging.getLogger('ebay_scraper')
+
+class Metrics:
+    """
+    低オーバーヘッドのカウンターとタイマー
+    
+    名前とラベルごとに、カウンターは合計値、タイマーは回数・合計秒・最大秒だけを保持する。
+    JSON Lines または Prometheus のテキスト形式で書き出せる。
+    """
+    def __init__(self, namespace='ebay_scraper'):
+        self.namespace = namespace
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._timers = {}  # キー -> [回数, 合計秒, 最大秒]
+
+    def incr(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, seconds, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            timer = self._timers.get(key)
+            if timer is None:
+                self._timers[key] = [1, seconds, seconds]
+            else:
+                timer[0] += 1
+                timer[1] += seconds
+                if seconds > timer[2]:
+                    timer[2] = seconds
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def counter(self, name, **labels):
+        return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+    def snapshot(self):
+        """
+        全指標を辞書のリストで返す
+        """
+        with self._lock:
+            counters = list(self._counters.items())
+            timers = [(key, list(values)) for key, values in self._timers.items()]
+        metrics = [
+            {'type': 'counter', 'name': name, 'labels': dict(labels), 'value': value}
+            for (name, labels), value in counters
+        ]
+        metrics.extend(
+            {'type': 'timer', 'name': name, 'labels': dict(labels), 'count': count, 'sum': total, 'max': longest}
+            for (name, labels), (count, total, longest) in timers
+        )
+        return metrics
+
+    def merge(self, metrics):
+        """
+        snapshot() の形式の指標（解析プロセスで記録したものなど）を合算する
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            for metric in metrics:
+                key = (metric['name'], tuple(sorted(metric['labels'].items())))
+                if metric['type'] == 'counter':
+                    self._counters[key] = self._counters.get(key, 0) + metric['value']
+                    continue
+                timer = self._timers.get(key)
+                if timer is None:
+                    self._timers[key] = [metric['count'], metric['sum'], metric['max']]
+                else:
+                    timer[0] += metric['count']
+                    timer[1] += metric['sum']
+                    timer[2] = max(timer[2], metric['max'])
+
+    def to_json_lines(self):
+        timestamp = datetime.now().isoformat()
+        return ''.join(
+            json.dumps({'ts': timestamp, **metric}, ensure_ascii=False) + '\n' for metric in self.snapshot()
+        )
+
+    def write_json_lines(self, path):
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(self.to_json_lines())
+
+    def to_prometheus(self):
+        """
+        Prometheus のテキスト形式（カウンターは *_total、タイマーは summary と *_max）
+        """
+        def labels_text(labels):
+            if not labels:
+                return ''
+            escape = lambda v: str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+            return '{' + ','.join(f'{k}="{escape(v)}"' for k, v in sorted(labels.items())) + '}'
+        
+        lines = []
+        declared = set()
+        for metric in sorted(self.snapshot(), key=lambda m: (m['type'], m['name'])):
+            name = f"{self.namespace}_{metric['name']}"
+            labels = labels_text(metric['labels'])
+            if metric['type'] == 'counter':
+                if name not in declared:
+                    lines.append(f"# TYPE {name}_total counter")
+                    declared.add(name)
+                lines.append(f"{name}_total{labels} {metric['value']}")
+            else:
+                if name not in declared:
+                    lines.append(f"# TYPE {name} summary")
+                    lines.append(f"# TYPE {name}_max gauge")
+                    declared.add(name)
+                lines.append(f"{name}_count{labels} {metric['count']}")
+                lines.append(f"{name}_sum{labels} {metric['sum']:.6f}")
+                lines.append(f"{name}_max{labels} {metric['max']:.6f}")
+        return '\n'.join(lines) + '\n'
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+
+METRICS = Metrics()
+METRICS_FILENAME = 'scraping_metrics.jsonl'
+
+def _sleep(seconds, reason):
+    """
+    待機して、その時間を理由ごとに記録する
+    """
+    METRICS.observe('sleep_seconds', seconds, reason=reason)
+    time.sleep(seconds)
+
+# User-Agent 一覧のキャッシュファイル（max_age 秒ごとに fake_useragent から作り直す）
+USER_AGENT_CACHE_PATH = '.ua_cache.json'
+
+# fake_useragent が使えない場合の User-Agent
+FALLBACK_USER_AGENTS = (
+    'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+    'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36',
+)
+
+def _load_chrome_user_agents(limit):
     """
-    Bot検出を回避するためのリアルなヘッダー
+    fake_useragent のデータからデスクトップ版 Chrome の User-Agent を利用率の高い順に取り出す
     """
+    from fake_useragent import UserAgent
     ua = UserAgent()
+    browsers = getattr(ua, 'data_browsers', None)
+    if isinstance(browsers, list):
+        entries = sorted(
+            (entry for entry in browsers
+             if str(entry.get('browser', '')).lower() == 'chrome' and entry.get('type') not in ('mobile', 'tablet')),
+            key=lambda entry: -entry.get('percent', 0)
+        )
+        agents = list(dict.fromkeys(entry['useragent'] for entry in entries))[:limit]
+    else:
+        # データ形式の異なる版では ua.chrome を何度か引いて集める
+        agents = list(dict.fromkeys(ua.chrome for _ in range(limit)))
+    return agents
+
+@lru_cache(maxsize=1)
+def get_user_agent_pool(path=USER_AGENT_CACHE_PATH, max_age=7 * 24 * 3600, limit=50):
+    """
+    ローテーション用の User-Agent 一覧（プロセス内で1回だけ読み込む）
+    
+    fake_useragent のデータセットの読み込みは重いため、取り出した一覧を path に保存し、
+    max_age 秒以内なら次回以降の起動ではそのファイルだけを読む。
+    """
+    try:
+        if time.time() - os.path.getmtime(path) < max_age:
+            with open(path, encoding='utf-8') as f:
+                agents = json.load(f)
+            if agents:
+                return tuple(agents)
+    except (OSError, ValueError):
+        pass
     
+    try:
+        agents = _load_chrome_user_agents(limit)
+    except Exception as e:
+        logger.warning(f"⚠️  User-Agent 一覧の読み込みに失敗: {e}")
+        return FALLBACK_USER_AGENTS
+    if not agents:
+        return FALLBACK_USER_AGENTS
+    try:
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(agents, f)
+        os.replace(path + '.tmp', path)
+    except OSError:
+        pass
+    return tuple(agents)
+
+def get_stealth_headers():
+    """
+    Bot検出を回避するためのリアルなヘッダー（User-Agent は呼び出しごと＝セッションごとに選び直す）
+    """
     return {
-        'User-Agent': ua.chrome,
+        'User-Agent': random.choice(get_user_agent_pool()),
         'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
         'Accept-Language': 'en-US,en;q=0.9,ja;q=0.8',
         'Accept-Encoding': 'gzip, deflate, br',
@@ -32,475 +263,3233 @@ def get_stealth_headers():
         'Referer': 'https://www.ebay.com/',
     }
 
-def get_ebay_session():
+# リトライ対象のステータスコード（一時的な過負荷・ゲートウェイ障害）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+class TransportStats:
+    """
+    リクエストごとのレイテンシ・エラー・リトライ回数の記録
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = array('d')  # 秒
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.status_counts = {}
+
+    def record(self, latency, status=None, error=False):
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            if error:
+                self.errors += 1
+            else:
+                self.status_counts[status] = self.status_counts.get(status, 0) + 1
+
+    def record_retry(self):
+        with self._lock:
+            self.retries += 1
+
+    def summary(self):
+        """
+        件数とレイテンシの分位点（ミリ秒）をまとめて返す
+        """
+        import numpy as np
+        with self._lock:
+            latencies = np.frombuffer(self.latencies, dtype=np.float64).copy()
+            summary = {
+                'requests': self.requests,
+                'errors': self.errors,
+                'retries': self.retries,
+                'status_counts': dict(self.status_counts),
+            }
+        if len(latencies):
+            p50, p95, p99 = (float(v) for v in np.quantile(latencies, [0.5, 0.95, 0.99]) * 1000)
+            summary.update(latency_ms_p50=p50, latency_ms_p95=p95, latency_ms_p99=p99,
+                           latency_ms_max=float(latencies.max() * 1000))
+        return summary
+
+def parse_retry_after(value, max_wait=60.0):
+    """
+    Retry-After ヘッダー（秒数またはHTTP日付）を待ち秒数に変換（なければNone）
+    """
+    if not value:
+        return None
+    try:
+        return min(max_wait, max(0.0, float(value)))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return min(max_wait, max(0.0, (retry_at - datetime.now(timezone.utc)).total_seconds()))
+
+class Transport:
+    """
+    接続プール付きのHTTP通信層
+    
+    同じインスタンスを使い回すことでキーワードをまたいでKeep-Alive接続を再利用する。
+    GETは一時的なエラー（接続リセット・タイムアウト・429/5xx）に対して指数バックオフ
+    +ジッターでリトライし、Retry-After ヘッダーがあればその待機時間に従う。
+    http2=True の場合は httpx（h2 が必要）で HTTP/2 の多重化を使う。
+    requests.Session と同じく headers と get() を持つので、セッションとして渡せる。
+    """
+    def __init__(self, pool_size=10, retries=3, backoff_factor=1.0, max_backoff=60.0, http2=False):
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.http2 = http2
+        self.stats = TransportStats()
+        # ホスト -> この通信層だけで使う HostBudget（ないホストは共有の予算に伝える）
+        self.host_budgets = {}
+        
+        if http2:
+            import httpx
+            self._client = httpx.Client(
+                http2=True,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size),
+            )
+            self._retryable_errors = (httpx.TransportError,)
+        else:
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            self._client.mount('https://', adapter)
+            self._client.mount('http://', adapter)
+            self._retryable_errors = (requests.ConnectionError, requests.Timeout)
+
+    @property
+    def headers(self):
+        return self._client.headers
+
+    @property
+    def cookies(self):
+        return self._client.cookies
+
+    def _backoff(self, attempt):
+        # 指数バックオフ + フルジッター
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * (2 ** attempt)))
+
+    def _retry_after(self, response):
+        return parse_retry_after(response.headers.get('Retry-After'), self.max_backoff)
+
+    def get(self, url, timeout=15, headers=None):
+        """
+        GETリクエスト（べき等なのでリトライ可能）
+        
+        返すレスポンスの attempt_seconds には最後の1回の所要時間（リトライの待機を含まない）を入れる。
+        """
+        for attempt in range(self.retries + 1):
+            started = time.perf_counter()
+            try:
+                response = self._client.get(url, timeout=timeout, headers=headers)
+            except self._retryable_errors:
+                self.stats.record(time.perf_counter() - started, error=True)
+                if attempt == self.retries:
+                    raise
+                delay = self._backoff(attempt)
+            else:
+                latency = time.perf_counter() - started
+                self.stats.record(latency, response.status_code)
+                if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                    response.attempt_seconds = latency
+                    return response
+                delay = self._retry_after(response)
+                # リトライで隠れる 429/503 もホストの速度調整に伝える
+                report_host_response(url, response, latency, retry_after=delay, budgets=self.host_budgets)
+                if delay is None:
+                    delay = self._backoff(attempt)
+            
+            self.stats.record_retry()
+            METRICS.incr('http_retries')
+            logger.info(f"    🔁 リトライ {attempt + 1}/{self.retries} ({delay:.1f}秒後): {url[:60]}")
+            _sleep(delay, 'retry')
+
+    def close(self):
+        self._client.close()
+
+def get_ebay_session(cache=None, **transport_options):
     """
     セッションとクッキーを取得
+    
+    transport_options は Transport に渡される（pool_size, retries, http2 など）。
     """
-    session = requests.Session()
+    session = Transport(**transport_options)
     session.headers.update(get_stealth_headers())
     
     # トップページにアクセスしてクッキーを取得
+    # （次の検索リクエストまでの間隔はホスト単位の予算が決める）
+    # キャッシュから返すとクッキーが付かないため、キャッシュはオフライン時だけ使う
     try:
-        response = session.get('https://www.ebay.com', timeout=10)
-        print(f"🍪 セッション開始: {response.status_code}")
-        time.sleep(random.uniform(1, 3))
+        budget = get_host_budget(SEARCH_URL)
+        warmup_cache = cache if cache is not None and cache.offline else None
+        response = cached_get(session, 'https://www.ebay.com', cache=warmup_cache, timeout=10, budget=budget)
+        logger.info(f"🍪 セッション開始: {response.status_code}")
         return session
     except Exception as e:
-        print(f"❌ セッション取得エラー: {e}")
+        logger.error(f"❌ セッション取得エラー: {e}")
         return None
 
-def extract_price_from_text(text):
+# 通貨別レート（2024年基準の概算レート）
+# 抽出時の概算と異常値の判定に使う。分析時の換算は FXProvider のレートで行う
+CURRENCY_RATES = {
+    "TWD": 0.032,   # 台湾ドル → USD (1 TWD ≈ 0.032 USD)
+    "HKD": 0.13,    # 香港ドル → USD (1 HKD ≈ 0.13 USD)
+    "CAD": 0.73,    # カナダドル → USD (1 CAD ≈ 0.73 USD)
+    "AUD": 0.66,    # 豪ドル → USD (1 AUD ≈ 0.66 USD)
+    "JPY": 0.0067,  # 日本円 → USD (1 JPY ≈ 0.0067 USD)
+    "EUR": 1.08,    # ユーロ → USD (1 EUR ≈ 1.08 USD)
+    "GBP": 1.25,    # 英ポンド → USD (1 GBP ≈ 1.25 USD)
+    "USD": 1.0      # 米ドル（基準通貨）
+}
+
+_AMOUNT = r'([\d,]+(?:\.\d{1,2})?)'
+
+# 通貨記号付きの価格パターン（優先度順）と対応する通貨コード
+_CURRENCY_ALTERNATIVES = [
+    (r'NT\$\s*' + _AMOUNT, "TWD"),              # 台湾ドル（NT$）- eBayでよく見られる
+    (r'HK\$\s*' + _AMOUNT, "HKD"),              # 香港ドル（HK$）
+    # カナダドル（C $）・豪ドル（AU $）は "$" の位置から後ろ読みで判定する（走査の起点を増やさない）
+    (r'(?:(?<=C)(?<![a-z]C)|(?<=C )(?<![a-z]C ))\$\s*' + _AMOUNT, "CAD"),
+    (r'(?:(?<=AU)(?<![a-z]AU)|(?<=AU )(?<![a-z]AU ))\$\s*' + _AMOUNT, "AUD"),
+    (r'¥\s*' + _AMOUNT, "JPY"),                  # 日本円（¥）
+    (r'€\s*' + _AMOUNT, "EUR"),                  # ユーロ（€）
+    (r'£\s*' + _AMOUNT, "GBP"),                  # 英ポンド（£）
+    (r'(?<!NT)(?<!HK)\$\s*' + _AMOUNT, "USD"),   # 米ドル（$）- NT$/HK$/C $/AU $ は先に評価される
+    (r'USD\s*' + _AMOUNT, "USD"),                # USD明示
+    (_AMOUNT + r'\s*USD', "USD"),
+]
+
+# 全通貨を1回の走査で見つける選択パターン。
+# 先読みの中に置くことで重なり合う候補も全て拾い、通貨ごとに最初の候補を優先度順に評価する。
+# 「金額 USD」は数字の位置ごとに試行が必要で重いため、本文に "usd" を含む場合だけ全パターン版を使う。
+_CURRENCY_PRICE_RE = re.compile(
+    r'(?=[NnHh¥€£$Uu\d,])(?=(?:' + '|'.join(pattern for pattern, _ in _CURRENCY_ALTERNATIVES) + '))',
+    re.IGNORECASE
+)
+_SYMBOL_PRICE_RE = re.compile(
+    r'(?=[NnHh¥€£$])(?=(?:' + '|'.join(pattern for pattern, _ in _CURRENCY_ALTERNATIVES[:-2]) + '))',
+    re.IGNORECASE
+)
+_CURRENCY_CODES = [code for _, code in _CURRENCY_ALTERNATIVES]
+
+# 通貨記号なしの数値パターン（最後の手段）
+_NUMBER_ONLY_RES = [
+    re.compile(r'sold\s+for\s+([\d,]+\.?\d*)', re.IGNORECASE),
+    re.compile(r'price[:\s]+([\d,]+\.?\d*)', re.IGNORECASE),
+    re.compile(r'([\d,]+\.?\d*)\s*(?:dollars?|usd)?', re.IGNORECASE),
+]
+
+PriceInfo = namedtuple('PriceInfo', ['amount', 'currency', 'usd'])
+
+def parse_price(text):
     """
-    テキストから価格を抽出し、適切な通貨換算を行う改良版関数
+    テキストから価格を抽出し (金額, 通貨コード, 米ドル換算額) を返す。見つからなければNone
     """
     if not text:
-        return "価格不明"
-    
-    # 通貨別レート（2024年基準の概算レート）
-    # 実際の運用では為替APIを使用することを推奨
-    rates = {
-        "NT$": 0.032,   # 台湾ドル → USD (1 TWD ≈ 0.032 USD)
-        "HK$": 0.13,    # 香港ドル → USD (1 HKD ≈ 0.13 USD) 
-        "¥": 0.0067,    # 日本円 → USD (1 JPY ≈ 0.0067 USD)
-        "€": 1.08,      # ユーロ → USD (1 EUR ≈ 1.08 USD)
-        "£": 1.25,      # 英ポンド → USD (1 GBP ≈ 1.25 USD)
-        "$": 1.0,       # 米ドル（基準通貨）
-        "USD": 1.0      # 明示的なUSD表記
-    }
+        return None
+    # 空白の連続は \s* / \s+ の一致結果に影響しないため1つにまとめてキャッシュキーにする
+    return _parse_normalized_price(' '.join(text.split()))
+
+@lru_cache(maxsize=8192)
+def _parse_normalized_price(text):
+    debug_mode = logger.isEnabledFor(logging.DEBUG)
     
-    # 通貨記号付きの価格パターン（優先度順）
-    currency_patterns = [
-        # 台湾ドル（NT$）- eBayでよく見られる
-        r'NT\$\s*([\d,]+(?:\.\d{1,2})?)',
-        # 香港ドル（HK$）
-        r'HK\$\s*([\d,]+(?:\.\d{1,2})?)',
-        # 日本円（¥）
-        r'¥\s*([\d,]+(?:\.\d{1,2})?)',
-        # ユーロ（€）
-        r'€\s*([\d,]+(?:\.\d{1,2})?)',
-        # 英ポンド（£）
-        r'£\s*([\d,]+(?:\.\d{1,2})?)',
-        # 米ドル（$）- 最後に処理（他の通貨と混同を避けるため）
-        r'(?<!NT)(?<!HK)\$\s*([\d,]+(?:\.\d{1,2})?)',
-        # USD明示
-        r'USD\s*([\d,]+(?:\.\d{1,2})?)',
-        r'([\d,]+(?:\.\d{1,2})?)\s*USD'
-    ]
+    # 通貨ごとに最初に現れた金額だけを記録
+    first_amounts = [None] * len(_CURRENCY_CODES)
+    pattern = _CURRENCY_PRICE_RE if 'usd' in text.lower() else _SYMBOL_PRICE_RE
+    for match in pattern.finditer(text):
+        index = match.lastindex - 1
+        if first_amounts[index] is None:
+            first_amounts[index] = match.group(match.lastindex)
     
-    # 通貨記号に対応する識別子
-    currency_symbols = ['NT$', 'HK$', '¥', '€', '£', '$', 'USD', 'USD']
+    for amount_str, currency in zip(first_amounts, _CURRENCY_CODES):
+        if amount_str is None:
+            continue
+        try:
+            amount = float(amount_str.replace(',', ''))
+        except ValueError:
+            continue
+        
+        if amount <= 0:
+            continue
+        
+        # 米ドルに換算
+        usd_amount = amount * CURRENCY_RATES[currency]
+        
+        if debug_mode:
+            logger.debug(f"    💰 価格変換: {currency} {amount:,} → ${usd_amount:.2f}")
+        
+        # 異常に高額な価格をフィルタリング（50万ドル以上は異常値として扱う）
+        if usd_amount > 500000:
+            if debug_mode:
+                logger.debug(f"    ⚠️  異常に高額な価格を検出: {currency} {amount:,} (${usd_amount:.2f}) - スキップ")
+            continue
+        
+        # 異常に安い価格もフィルタリング（1ドル未満）
+        if usd_amount < 1.0:
+            continue
+        
+        return PriceInfo(amount, currency, usd_amount)
     
-    # 各パターンを試行
-    for i, pattern in enumerate(currency_patterns):
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
+    for pattern in _NUMBER_ONLY_RES:
+        match = pattern.search(text)
+        if match:
             try:
-                # 最初にマッチした金額を取得
-                amount_str = matches[0].replace(',', '')
-                amount = float(amount_str)
-                
-                if amount <= 0:
-                    continue
-                
-                # 通貨記号を特定
-                currency = currency_symbols[i]
-                
-                # 米ドルに換算
-                if currency in rates:
-                    usd_amount = amount * rates[currency]
-                else:
-                    # 不明な通貨の場合はそのまま（米ドルと仮定）
-                    usd_amount = amount
-                
-                # デバッグ出力（必要に応じて有効化）
-                debug_mode = getattr(extract_price_from_text, 'debug_mode', False)
-                if debug_mode:
-                    print(f"    💰 価格変換: {currency}{amount:,} → ${usd_amount:.2f}")
+                amount = float(match.group(1).replace(',', ''))
                 
-                # 異常に高額な価格をフィルタリング（50万ドル以上は異常値として扱う）
-                if usd_amount > 500000:
-                    if debug_mode:
-                        print(f"    ⚠️  異常に高額な価格を検出: {currency}{amount:,} (${usd_amount:.2f}) - スキップ")
-                    continue
-                
-                # 異常に安い価格もフィルタリング（1ドル未満）
-                if usd_amount < 1.0:
-                    continue
-                
-                return f"${usd_amount:.2f}"
-                
-            except (ValueError, IndexError):
+                # 妥当な価格範囲かチェック
+                if 1.0 <= amount <= 500000:
+                    return PriceInfo(amount, "USD", amount)
+            except ValueError:
                 continue
     
-    # 通貨記号なしの数値パターン（最後の手段）
-    number_only_patterns = [
-        r'sold\s+for\s+([\d,]+\.?\d*)',
-        r'price[:\s]+([\d,]+\.?\d*)',
-        r'([\d,]+\.?\d*)\s*(?:dollars?|usd)?'
-    ]
+    return None
+
+def format_price(price_info):
+    """
+    PriceInfo を "$20.00" 形式の文字列にする（価格不明の場合は "価格不明"）
+    """
+    if price_info is None:
+        return "価格不明"
+    return f"${price_info.usd:.2f}"
+
+def extract_price_from_text(text):
+    """
+    テキストから価格を抽出し、米ドル換算した "$20.00" 形式の文字列を返す
+    """
+    return format_price(parse_price(text))
+
+class FXProvider:
+    """
+    為替レートの取得元（レートは1通貨単位あたりの米ドル額）
+    
+    サブクラスは fetch_rates(day) を実装する。day が None なら最新、date なら
+    その日のレートを {通貨コード: レート} で返す。
+    """
+    def fetch_rates(self, day=None):
+        raise NotImplementedError
+
+    def rates(self, day=None):
+        return self.fetch_rates(day)
+
+    def rate(self, currency, day=None):
+        """
+        1通貨単位あたりの米ドル額（不明な通貨はNone）
+        """
+        if currency == "USD":
+            return 1.0
+        return self.rates(day).get(currency)
+
+class StaticFXProvider(FXProvider):
+    """
+    固定のレート表（既定は CURRENCY_RATES、日付によらず同じ）
+    """
+    def __init__(self, rates=None):
+        self._rates = dict(rates or CURRENCY_RATES)
+
+    def fetch_rates(self, day=None):
+        return self._rates
+
+class FileFXProvider(FXProvider):
+    """
+    JSONファイルのレート表 {"rates": {...}, "history": {"2026-10-01": {...}, ...}}
+    
+    履歴にない日付は、その日以前で最も近い日のレートを使う（それもなければ rates）。
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def fetch_rates(self, day=None):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if day is not None:
+            history = data.get('history', {})
+            past = [key for key in history if key <= day.isoformat()]
+            if past:
+                return history[max(past)]
+        return data['rates']
+
+class HTTPFXProvider(FXProvider):
+    """
+    レート配信サービスから取得（GET url?date=YYYY-MM-DD → {"rates": {...}}、最新は date なし）
+    """
+    def __init__(self, url, session=None, timeout=10):
+        self.url = url
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def fetch_rates(self, day=None):
+        params = {'date': day.isoformat()} if day is not None else None
+        response = self.session.get(self.url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()['rates']
+
+class CachedFXProvider(FXProvider):
+    """
+    別の FXProvider のレートをメモリとディスク（日付ごとのJSON）にキャッシュする
     
-    for pattern in number_only_patterns:
-        matches = re.findall(pattern, text, re.IGNORECASE)
-        if matches:
+    最新と当日以降のレートは refresh_interval 秒ごとに取り直し、確定した過去の日付は
+    一度取得したら取り直さない。取得に失敗した場合は古いキャッシュ、それもなければ
+    fallback（既定は固定レート表）を使う。
+    """
+    def __init__(self, provider, directory='.fx_cache', refresh_interval=6 * 3600, fallback=None):
+        self.provider = provider
+        self.directory = directory
+        self.refresh_interval = refresh_interval
+        self.fallback = fallback or StaticFXProvider()
+        self._memory = {}  # 日付（最新は 'latest'）-> (取得時刻, レート)
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.json')
+
+    def _load(self, key):
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return data['fetched_at'], data['rates']
+
+    def _save(self, key, entry):
+        path = self._path(key)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fetched_at': entry[0], 'rates': entry[1]}, f)
+        os.replace(path + '.tmp', path)
+
+    def _is_fresh(self, key, fetched_at):
+        if key != 'latest' and key < datetime.now().date().isoformat():
+            return True
+        return time.time() - fetched_at < self.refresh_interval
+
+    def fetch_rates(self, day=None):
+        key = day.isoformat() if day is not None else 'latest'
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None:
+                entry = self._load(key)
+                if entry is not None:
+                    self._memory[key] = entry
+            if entry is not None and self._is_fresh(key, entry[0]):
+                return entry[1]
             try:
-                amount_str = matches[0].replace(',', '')
-                amount = float(amount_str)
-                
-                # 妥当な価格範囲かチェック
-                if 1.0 <= amount <= 500000:
-                    return f"${amount:.2f}"
-            except (ValueError, IndexError):
-                continue
+                rates = dict(self.provider.fetch_rates(day))
+            except Exception as e:
+                logger.warning(f"⚠️ 為替レート取得エラー ({key}): {e}")
+                return entry[1] if entry is not None else self.fallback.rates(day)
+            entry = (time.time(), rates)
+            self._memory[key] = entry
+            self._save(key, entry)
+            METRICS.incr('fx_rate_fetches')
+            return rates
+
+_fx_provider = None
+
+def get_fx_provider():
+    """
+    既定の為替レート取得元
     
-    return "価格不明"
+    環境変数 FX_RATES_URL（配信サービス）か FX_RATES_FILE（JSONファイル）があれば
+    キャッシュ付きでそれを使い、なければ固定レート表を使う。
+    """
+    global _fx_provider
+    if _fx_provider is None:
+        if os.environ.get('FX_RATES_URL'):
+            _fx_provider = CachedFXProvider(HTTPFXProvider(os.environ['FX_RATES_URL']))
+        elif os.environ.get('FX_RATES_FILE'):
+            _fx_provider = CachedFXProvider(FileFXProvider(os.environ['FX_RATES_FILE']))
+        else:
+            _fx_provider = StaticFXProvider()
+    return _fx_provider
 
-def extract_item_data(item_element):
+def set_fx_provider(provider):
+    global _fx_provider
+    _fx_provider = provider
+
+_SOLD_DATE_RE = re.compile(r'([A-Za-z]{3})[a-z]*\.?\s+(\d{1,2}),?\s+(\d{4})')
+
+@lru_cache(maxsize=4096)
+def parse_sold_date(text):
     """
-    商品要素から詳細情報を抽出（改良版価格処理付き）
+    "Sold  Oct 18, 2026" 形式の販売日を日付に変換（読めなければ None）
     """
+    match = _SOLD_DATE_RE.search(text or '')
+    if not match:
+        return None
     try:
-        # タイトル抽出（改良版）
-        title = "タイトル不明"
-        
-        # 方法1: 様々なセレクタを試す
-        title_selectors = [
-            'h3.s-item__title',
-            '.s-item__title',
-            'h3',
-            '.s-item__title-label',
-            'a[href*="/itm/"]'
-        ]
-        
-        for selector in title_selectors:
-            title_elem = item_element.select_one(selector)
-            if title_elem:
-                title_text = title_elem.get_text().strip()
-                # 不要な文字列を除外
-                if title_text and len(title_text) > 10 and not any(x in title_text.lower() for x in ['shop on ebay', 'new listing', 'opens in']):
-                    title = title_text
-                    break
-        
-        # 方法2: 全てのaタグからリンクテキストを探す
-        if title == "タイトル不明":
-            links = item_element.find_all('a', href=lambda x: x and '/itm/' in x)
-            for link in links:
-                link_text = link.get_text().strip()
-                if len(link_text) > 15 and not any(x in link_text.lower() for x in ['shop on ebay', 'new listing', 'opens in']):
-                    title = link_text
-                    break
-        
-        # 価格抽出（改良版関数を使用）
-        price = "価格不明"
-        
-        # 方法1: 売り切れ商品特有のセレクタを試す
-        price_selectors = [
-            '.s-item__price',
-            '.s-item__detail--primary',
-            '.s-item__details',
-            '.s-item__soldPrice',
-            '.sold-price',
-            '.s-item__price-soldValue',
-            '.notranslate'
-        ]
-        
-        for selector in price_selectors:
-            price_elem = item_element.select_one(selector)
-            if price_elem:
-                price_text = price_elem.get_text().strip()
-                extracted_price = extract_price_from_text(price_text)
-                if extracted_price != "価格不明":
-                    price = extracted_price
-                    break
-        
-        # 方法2: より広い範囲でテキスト検索
-        if price == "価格不明":
-            # 商品要素全体のテキストから価格を抽出
-            all_text = item_element.get_text()
-            price = extract_price_from_text(all_text)
-        
-        # 方法3: span要素から価格を探す
-        if price == "価格不明":
-            spans = item_element.find_all('span')
-            for span in spans:
-                span_text = span.get_text().strip()
-                if any(keyword in span_text.lower() for keyword in ['sold', 'price', '$', 'usd', 'nt$']):
-                    extracted_price = extract_price_from_text(span_text)
-                    if extracted_price != "価格不明":
-                        price = extracted_price
-                        break
-        
-        # 商品URL抽出
-        link_elem = item_element.select_one('a[href*="/itm/"]')
-        url = link_elem.get('href') if link_elem else ""
-        
-        # 画像URL抽出
-        img_elem = item_element.select_one('img')
-        image_url = ""
-        if img_elem:
-            image_url = img_elem.get('src') or img_elem.get('data-src') or ""
-        
-        # 送料情報
-        shipping_elem = item_element.select_one('.s-item__shipping, .s-item__freeXDays')
-        shipping = shipping_elem.get_text().strip() if shipping_elem else ""
-        
-        # 販売者情報
-        seller_elem = item_element.select_one('.s-item__seller-info, .s-item__seller-info-text')
-        seller = seller_elem.get_text().strip() if seller_elem else ""
-        
-        # 販売日時（売り切れ商品の場合）
-        sold_elem = item_element.select_one('.s-item__sold-date, .s-item__endedDate, .s-item__detail--primary')
-        sold_date = sold_elem.get_text().strip() if sold_elem else ""
-        
-        # デバッグ出力（最初の数件のみ）
-        if not hasattr(extract_item_data, 'debug_count'):
-            extract_item_data.debug_count = 0
-        
-        if extract_item_data.debug_count < 5:
-            print(f"    🔍 商品 {extract_item_data.debug_count + 1}:")
-            print(f"      タイトル: {title}")
-            print(f"      価格: {price}")
-            print(f"      URL: {url[:50]}..." if url else "URL不明")
-            
-            # デバッグ用：商品要素の一部テキストを表示
-            debug_text = item_element.get_text()[:200]
-            print(f"      要素テキスト: {debug_text}...")
-            
-            extract_item_data.debug_count += 1
-        
+        return datetime.strptime(' '.join(match.groups()), '%b %d %Y').date()
+    except ValueError:
+        return None
+
+def parse_sold_dates(values):
+    """
+    "Sold  Oct 18, 2026" 形式の販売日を一括で日付に変換（読めないものは NaT）
+    """
+    import pandas as pd
+    text = pd.Series(values, dtype='string').str.extract(_SOLD_DATE_RE.pattern)
+    return pd.to_datetime(text[0] + ' ' + text[1] + ' ' + text[2], format='%b %d %Y', errors='coerce').dt.date
+
+def convert_prices_to_usd(amounts, currencies, days=None, provider=None):
+    """
+    金額と通貨コード（と日付）の列を米ドルに一括換算する（換算できない行は NaN）
+    
+    レートの参照は (通貨, 日付) の組み合わせごとに1回だけ行い、掛け算は配列でまとめて行う。
+    """
+    import numpy as np
+    import pandas as pd
+    provider = provider or get_fx_provider()
+    amounts = pd.to_numeric(pd.Series(amounts), errors='coerce').to_numpy(dtype=np.float64)
+    currency_codes, currency_values = pd.factorize(pd.Series(currencies, dtype='string'))
+    if days is None:
+        day_codes, day_values = np.full(len(amounts), -1), []
+    else:
+        day_codes, day_values = pd.factorize(pd.Series(days, dtype='object'))
+    
+    # (通貨, 日付) の組を1つの番号にまとめ、組ごとにレートを引く（-1 は不明・日付なし）
+    pair_codes, pair_index = np.unique(currency_codes * (len(day_values) + 1) + (day_codes + 1), return_inverse=True)
+    rates = np.full(len(pair_codes), np.nan)
+    for index, code in enumerate(pair_codes.tolist()):
+        currency_code, day_code = divmod(code, len(day_values) + 1)
+        if currency_code < 0 or not currency_values[currency_code]:
+            continue
+        day = day_values[day_code - 1] if day_code else None
+        rate = provider.rate(currency_values[currency_code], day)
+        if rate is not None:
+            rates[index] = rate
+    return amounts * rates[pair_index]
+
+class Currency(IntEnum):
+    """
+    元の表示通貨（1バイトで保持するための列挙型）
+    """
+    UNKNOWN = 0
+    USD = 1
+    TWD = 2
+    HKD = 3
+    JPY = 4
+    EUR = 5
+    GBP = 6
+    CAD = 7
+    AUD = 8
+
+# 価格不明を表す price_cents の値
+PRICE_UNKNOWN = -1
+
+@dataclass(slots=True)
+class ItemRecord:
+    """
+    1商品分のコンパクトなレコード
+    
+    価格は米ドル換算（概算レート）のセント単位の整数、通貨は Currency、取得時刻はエポック秒で持つ。
+    price_amount には元の通貨での金額を残し、分析時に FXProvider のレートで換算し直せるようにする。
+    キーワードと販売者名は intern して同じ文字列を共有する。
+    keywords には重複して見つかった商品の検索キーワードをまとめる（None なら keyword だけ）。
+    辞書と同じく get() / [] / keys() で項目を読めるため、辞書を受け取る処理にもそのまま渡せる。
+    """
+    title: str
+    price_cents: int = PRICE_UNKNOWN
+    currency: Currency = Currency.UNKNOWN
+    url: str = ""
+    item_id: int = 0
+    image_url: str = ""
+    shipping: str = ""
+    seller: str = ""
+    sold_date: str = ""
+    scraped_at: int = 0
+    keyword: str = ""
+    price_amount: float = None
+    keywords: list = None
+
+    @classmethod
+    def from_price_info(cls, title, price_info, **fields):
+        if price_info is None:
+            return cls(title, **fields)
+        # 表示用の "$20.00" と同じ丸め方でセントにする
+        return cls(title, round(round(price_info.usd, 2) * 100), Currency[price_info.currency],
+                   price_amount=price_info.amount, **fields)
+
+    @classmethod
+    def from_dict(cls, item):
+        """
+        従来の商品辞書（to_dict() の形式）から復元する
+        """
+        price_usd = item_price_usd(item)
+        currency = item.get('currency') or ''
+        scraped_at = item.get('scraped_at')
+        keywords = item.get('keywords')
+        return cls(
+            item.get('title', ''),
+            PRICE_UNKNOWN if price_usd is None else round(price_usd * 100),
+            Currency[currency] if currency in Currency.__members__ else Currency.UNKNOWN,
+            item.get('url', ''),
+            int(item.get('item_id') or 0),
+            item.get('image_url', ''),
+            item.get('shipping', ''),
+            sys.intern(item.get('seller', '')),
+            item.get('sold_date', ''),
+            int(datetime.fromisoformat(scraped_at).timestamp()) if scraped_at else 0,
+            sys.intern(item.get('keyword', '')),
+            item.get('price_amount'),
+            list(keywords) if isinstance(keywords, (list, tuple)) else None,
+        )
+
+    @property
+    def price_usd(self):
+        return None if self.price_cents == PRICE_UNKNOWN else self.price_cents / 100
+
+    @property
+    def price(self):
+        # 従来の辞書と同じ "$20.00" 形式
+        return "価格不明" if self.price_cents == PRICE_UNKNOWN else f"${self.price_cents / 100:.2f}"
+
+    def to_dict(self):
+        """
+        従来の商品辞書と同じ形式に変換（CSV出力など互換用）
+        """
         return {
-            'title': title,
-            'price': price,
-            'url': url,
-            'image_url': image_url,
-            'shipping': shipping,
-            'seller': seller,
-            'sold_date': sold_date,
-            'scraped_at': datetime.now().isoformat()
+            'title': self.title,
+            'price': self.price,
+            'price_amount': self.price_amount,
+            'currency': self['currency'],
+            'url': self.url,
+            'item_id': str(self.item_id) if self.item_id else "",
+            'image_url': self.image_url,
+            'shipping': self.shipping,
+            'seller': self.seller,
+            'sold_date': self.sold_date,
+            'scraped_at': datetime.fromtimestamp(self.scraped_at).isoformat(),
+            'keyword': self.keyword,
+            'keywords': self['keywords'],
         }
-    except Exception as e:
-        print(f"⚠️ 商品データ抽出エラー: {e}")
-        return None
 
-def search_japanese_items(session, keywords, pages=3):
+    def keys(self):
+        return ITEM_DICT_KEYS
+
+    def get(self, name, default=None):
+        if name in ITEM_DICT_KEYS:
+            return self[name]
+        return default
+
+    def __getitem__(self, name):
+        if name == 'price':
+            return self.price
+        if name == 'currency':
+            return "" if self.currency == Currency.UNKNOWN else self.currency.name
+        if name == 'item_id':
+            return str(self.item_id) if self.item_id else ""
+        if name == 'scraped_at':
+            return datetime.fromtimestamp(self.scraped_at).isoformat()
+        if name == 'keywords':
+            if self.keywords is not None:
+                return list(self.keywords)
+            return [self.keyword] if self.keyword else []
+        if name in ITEM_DICT_KEYS:
+            return getattr(self, name)
+        raise KeyError(name)
+
+ITEM_DICT_KEYS = ('title', 'price', 'price_amount', 'currency', 'url', 'item_id', 'image_url', 'shipping', 'seller', 'sold_date',
+                  'scraped_at', 'keyword', 'keywords')
+
+class ItemBatch:
+    """
+    ItemRecord を列ごとの配列にまとめた形式（数値列は array で保持）
+    """
+    _STRING_FIELDS = ('title', 'url', 'image_url', 'shipping', 'seller', 'sold_date', 'keyword')
+
+    def __init__(self, records=()):
+        self.price_cents = array('q')
+        self.price_amount = array('d')  # 価格不明は NaN
+        self.currency = array('B')
+        self.item_id = array('q')
+        self.scraped_at = array('q')
+        self.strings = {name: [] for name in self._STRING_FIELDS}
+        self.keywords = []  # まとめた検索キーワード（なければ None）
+        for record in records:
+            self.append(record)
+
+    def append(self, record):
+        self.price_cents.append(record.price_cents)
+        self.price_amount.append(float('nan') if record.price_amount is None else record.price_amount)
+        self.currency.append(record.currency)
+        self.item_id.append(record.item_id)
+        self.scraped_at.append(record.scraped_at)
+        self.keywords.append(record.keywords)
+        for name, column in self.strings.items():
+            column.append(getattr(record, name))
+
+    def __len__(self):
+        return len(self.price_cents)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        strings = {name: column[i] for name, column in self.strings.items()}
+        amount = self.price_amount[i]
+        return ItemRecord(
+            price_cents=self.price_cents[i], currency=Currency(self.currency[i]),
+            price_amount=None if amount != amount else amount,
+            item_id=self.item_id[i], scraped_at=self.scraped_at[i], keywords=self.keywords[i], **strings
+        )
+
+    def to_dataframe(self):
+        """
+        型付きの DataFrame に変換（価格は price_usd 列の数値、価格不明は NaN）
+        """
+        import numpy as np
+        import pandas as pd
+        cents = np.frombuffer(self.price_cents, dtype=np.int64)
+        df = pd.DataFrame(self.strings)
+        df['price_usd'] = np.where(cents == PRICE_UNKNOWN, np.nan, cents / 100)
+        df['price_amount'] = np.frombuffer(self.price_amount, dtype=np.float64)
+        df['currency'] = pd.Categorical.from_codes(
+            np.frombuffer(self.currency, dtype=np.uint8), categories=[c.name for c in Currency]
+        )
+        df['item_id'] = np.frombuffer(self.item_id, dtype=np.int64)
+        df['scraped_at'] = pd.to_datetime(np.frombuffer(self.scraped_at, dtype=np.int64), unit='s', utc=True)
+        df['keywords'] = [
+            keywords if keywords is not None else ([keyword] if keyword else [])
+            for keywords, keyword in zip(self.keywords, self.strings['keyword'])
+        ]
+        return df
+
+_PRICE_VALUE_RE = re.compile(r'[\d,]+\.?\d*')
+
+def item_price_usd(item, fx=None):
+    """
+    商品の米ドル価格を数値で返す（価格不明ならNone）
+    
+    ItemRecord はそのまま数値を返し、辞書の場合だけ "$20.00" 形式の文字列を解析する。
+    fx に FXProvider を渡すと、元の金額と通貨があれば販売日のレートで換算し直す。
+    """
+    if fx is not None:
+        price = _converted_price_usd(item, fx)
+        if price is not None:
+            return price
+    if isinstance(item, ItemRecord):
+        return item.price_usd
+    price_str = item.get('price', '')
+    if not price_str or price_str == "価格不明":
+        return None
+    price_match = _PRICE_VALUE_RE.search(str(price_str))
+    if not price_match:
+        return None
+    try:
+        return float(price_match.group().replace(',', ''))
+    except ValueError:
+        return None
+
+def _converted_price_usd(item, fx):
+    """
+    元の金額と通貨を fx のレートで米ドルに換算する（換算できなければNone）
+    """
+    currency = item.get('currency')
+    try:
+        amount = float(item.get('price_amount'))
+    except (TypeError, ValueError):
+        return None
+    if not currency or not math.isfinite(amount):
+        return None
+    rate = fx.rate(str(currency), parse_sold_date(item.get('sold_date') or ''))
+    return None if rate is None else amount * rate
+
+def _trie_pattern(terms):
+    """
+    キーワード群を接頭辞を共有する木構造の正規表現にする（例: japan(?:ese)?）
+    """
+    trie = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[''] = True
+    
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        # ここで終わる語もある場合、続きは省略可能（最長一致を優先）
+        return f'(?:{body})?' if '' in node else body
+    
+    return build(trie)
+
+class KeywordMatcher:
+    """
+    キーワード群を1つの正規表現にまとめた照合器（大文字小文字は区別しない）
+    
+    接頭辞を共有する木構造の正規表現（Aho-Corasick 風）にコンパイルするため、
+    キーワードが数百個に増えてもテキストの走査は1回で済み、一致したキーワードも
+    そのまま得られる（重なる場合は最長のもの）。
+    word_boundary=True の場合は語頭でのみ一致させる
+    （'zen' は 'dozen' に一致しないが、'japan' は 'japanese' に一致する）。
+    """
+    def __init__(self, terms, word_boundary=False):
+        self.terms = list(dict.fromkeys(term.lower() for term in terms if term))
+        prefix = r'\b' if word_boundary else ''
+        self._pattern = re.compile(prefix + _trie_pattern(self.terms), re.IGNORECASE) if self.terms else None
+
+    def search(self, text):
+        """
+        いずれかのキーワードを含むかどうか
+        """
+        return bool(text) and self._pattern is not None and self._pattern.search(text) is not None
+
+    def matches(self, text):
+        """
+        テキスト中に現れたキーワードを出現順に（重複なしで）返す
+        """
+        if not text or self._pattern is None:
+            return []
+        return list(dict.fromkeys(match.group().lower() for match in self._pattern.finditer(text)))
+
+@lru_cache(maxsize=32)
+def get_keyword_matcher(terms, word_boundary=False):
+    """
+    キーワードのタプルに対応する照合器を取得（同じ組み合わせは一度だけコンパイル）
+    """
+    return KeywordMatcher(terms, word_boundary)
+
+# タイトルとして使わない定型文言
+TITLE_BLACKLIST = ('shop on ebay', 'new listing', 'opens in')
+# 価格が含まれていそうなspanの目印
+PRICE_HINTS = ('sold', 'price', '$', 'usd', 'nt$')
+
+# 抽出対象のCSSセレクタ（優先度順）
+ITEM_SELECTOR = 'li[data-view]'
+TITLE_SELECTORS = [
+    'h3.s-item__title',
+    '.s-item__title',
+    'h3',
+    '.s-item__title-label',
+    'a[href*="/itm/"]'
+]
+PRICE_SELECTORS = [
+    '.s-item__price',
+    '.s-item__detail--primary',
+    '.s-item__details',
+    '.s-item__soldPrice',
+    '.sold-price',
+    '.s-item__price-soldValue',
+    '.notranslate'
+]
+LINK_SELECTOR = 'a[href*="/itm/"]'
+IMAGE_SELECTOR = 'img'
+SHIPPING_SELECTOR = '.s-item__shipping, .s-item__freeXDays'
+SELLER_SELECTOR = '.s-item__seller-info, .s-item__seller-info-text'
+SOLD_DATE_SELECTOR = '.s-item__sold-date, .s-item__endedDate, .s-item__detail--primary'
+
+def _is_item_link(href):
+    return href and '/itm/' in href
+
+class SoupExtractionPlan:
+    """
+    BeautifulSoup (html.parser) 用の抽出プラン（セレクタはsoupsieveで事前コンパイル）
+    """
+    name = 'html.parser'
+
+    def __init__(self):
+        self.items = soupsieve.compile(ITEM_SELECTOR)
+        self.titles = [soupsieve.compile(s) for s in TITLE_SELECTORS]
+        self.prices = [soupsieve.compile(s) for s in PRICE_SELECTORS]
+        self.link = soupsieve.compile(LINK_SELECTOR)
+        self.image = soupsieve.compile(IMAGE_SELECTOR)
+        self.shipping = soupsieve.compile(SHIPPING_SELECTOR)
+        self.seller = soupsieve.compile(SELLER_SELECTOR)
+        self.sold_date = soupsieve.compile(SOLD_DATE_SELECTOR)
+
+    def parse_items(self, html):
+        soup = BeautifulSoup(html, 'html.parser')
+        # 広告や無関係な要素を除外
+        return [item for item in self.items.select(soup) if item.find('a', href=_is_item_link)]
+
+    def first(self, element, selector):
+        return selector.select_one(element)
+
+    def text(self, element):
+        return element.get_text()
+
+    def attr(self, element, name):
+        return element.get(name)
+
+    def item_links(self, element):
+        return element.find_all('a', href=_is_item_link)
+
+    def spans(self, element):
+        return element.find_all('span')
+
+class LxmlExtractionPlan:
+    """
+    lxml 用の抽出プラン（セレクタは一度だけXPathにコンパイルして再利用）
+    """
+    name = 'lxml'
+
+    def __init__(self):
+        translator = HTMLTranslator()
+        compile_css = lambda css: etree.XPath(translator.css_to_xpath(css, prefix='descendant::'))
+        self._parser = lxml_html.HTMLParser(encoding='utf-8')
+        self.items = compile_css(ITEM_SELECTOR)
+        self.titles = [compile_css(s) for s in TITLE_SELECTORS]
+        self.prices = [compile_css(s) for s in PRICE_SELECTORS]
+        self.link = compile_css(LINK_SELECTOR)
+        self.image = compile_css(IMAGE_SELECTOR)
+        self.shipping = compile_css(SHIPPING_SELECTOR)
+        self.seller = compile_css(SELLER_SELECTOR)
+        self.sold_date = compile_css(SOLD_DATE_SELECTOR)
+        self._item_links = etree.XPath('descendant::a[contains(@href, "/itm/")]')
+        self._spans = etree.XPath('descendant::span')
+
+    def parse_items(self, html):
+        if not html or not html.strip():
+            return []
+        root = lxml_html.document_fromstring(html.encode('utf-8'), parser=self._parser)
+        # 広告や無関係な要素を除外
+        return [item for item in self.items(root) if self._item_links(item)]
+
+    def first(self, element, selector):
+        found = selector(element)
+        return found[0] if found else None
+
+    def text(self, element):
+        return element.text_content()
+
+    def attr(self, element, name):
+        return element.get(name)
+
+    def item_links(self, element):
+        return self._item_links(element)
+
+    def spans(self, element):
+        return self._spans(element)
+
+PARSER_BACKENDS = {
+    'html.parser': SoupExtractionPlan,
+    'lxml': LxmlExtractionPlan,
+}
+DEFAULT_PARSER_BACKEND = 'lxml' if lxml_html is not None else 'html.parser'
+
+_extraction_plans = {}
+
+def get_extraction_plan(backend=None):
+    """
+    パーサーバックエンドに対応する抽出プランを取得（初回のみコンパイル）
+    """
+    backend = backend or DEFAULT_PARSER_BACKEND
+    plan = _extraction_plans.get(backend)
+    if plan is None:
+        if backend not in PARSER_BACKENDS:
+            raise ValueError(f"未対応のパーサーバックエンド: {backend}")
+        plan = PARSER_BACKENDS[backend]()
+        _extraction_plans[backend] = plan
+    return plan
+
+_ITEM_ID_RE = re.compile(r'/itm/(?:[^/?#]+/)?(\d{9,})')
+
+def parse_item_id(url):
+    """
+    商品URL（/itm/...）からeBayの商品IDを取り出す（見つからなければ空文字）
+    """
+    match = _ITEM_ID_RE.search(url or '')
+    return match.group(1) if match else ""
+
+def extract_item_data(item_element, plan=None, as_record=False, spec=None, keyword=''):
+    """
+    商品要素から詳細情報を抽出（改良版価格処理付き）
+    
+    plan を省略した場合は BeautifulSoup の要素として扱う。
+    as_record=True の場合は辞書ではなく ItemRecord を返す（keyword は呼び出し側で設定）。
+    spec に FilterSpec を渡すと段階的に抽出する。タイトルと価格を取り出した時点で
+    条件を判定し、除外される商品はNoneを返して残りの項目を抽出しない。
+    """
+    if plan is None:
+        plan = get_extraction_plan('html.parser')
+    title_blacklist = get_keyword_matcher(TITLE_BLACKLIST)
+    
+    try:
+        # タイトル抽出（改良版）
+        title = "タイトル不明"
+        
+        # 方法1: 様々なセレクタを試す
+        for selector in plan.titles:
+            title_elem = plan.first(item_element, selector)
+            if title_elem is not None:
+                title_text = plan.text(title_elem).strip()
+                # 不要な文字列を除外
+                if title_text and len(title_text) > 10 and not title_blacklist.search(title_text):
+                    title = title_text
+                    break
+        
+        # 方法2: 全てのaタグからリンクテキストを探す
+        if title == "タイトル不明":
+            links = plan.item_links(item_element)
+            for link in links:
+                link_text = plan.text(link).strip()
+                if len(link_text) > 15 and not title_blacklist.search(link_text):
+                    title = link_text
+                    break
+        
+        if spec is not None and not (spec.title_ok(title) and spec.is_relevant(title, keyword)):
+            METRICS.incr('items_rejected_early', stage='title')
+            return None
+        
+        # 価格抽出（改良版関数を使用）
+        price_info = None
+        
+        # 方法1: 売り切れ商品特有のセレクタを試す
+        for selector in plan.prices:
+            price_elem = plan.first(item_element, selector)
+            if price_elem is not None:
+                price_info = parse_price(plan.text(price_elem).strip())
+                if price_info is not None:
+                    break
+        
+        # 方法2: より広い範囲でテキスト検索
+        if price_info is None:
+            # 商品要素全体のテキストから価格を抽出
+            price_info = parse_price(plan.text(item_element))
+        
+        # 方法3: span要素から価格を探す
+        if price_info is None:
+            price_hints = get_keyword_matcher(PRICE_HINTS)
+            spans = plan.spans(item_element)
+            for span in spans:
+                span_text = plan.text(span).strip()
+                if price_hints.search(span_text):
+                    price_info = parse_price(span_text)
+                    if price_info is not None:
+                        break
+        
+        if spec is not None and not spec.price_ok(round(price_info.usd, 2) if price_info else None):
+            METRICS.incr('items_rejected_early', stage='price')
+            return None
+        
+        price = format_price(price_info)
+        
+        # 商品URL抽出
+        link_elem = plan.first(item_element, plan.link)
+        url = plan.attr(link_elem, 'href') if link_elem is not None else ""
+        item_id = parse_item_id(url)
+        
+        # 画像URL抽出
+        img_elem = plan.first(item_element, plan.image)
+        image_url = ""
+        if img_elem is not None:
+            image_url = plan.attr(img_elem, 'src') or plan.attr(img_elem, 'data-src') or ""
+        
+        # 送料情報
+        shipping_elem = plan.first(item_element, plan.shipping)
+        shipping = plan.text(shipping_elem).strip() if shipping_elem is not None else ""
+        
+        # 販売者情報
+        seller_elem = plan.first(item_element, plan.seller)
+        seller = plan.text(seller_elem).strip() if seller_elem is not None else ""
+        
+        # 販売日時（売り切れ商品の場合）
+        sold_elem = plan.first(item_element, plan.sold_date)
+        sold_date = plan.text(sold_elem).strip() if sold_elem is not None else ""
+        
+        if price_info is None:
+            METRICS.incr('price_unknown')
+        else:
+            METRICS.incr('price_parsed', currency=price_info.currency)
+        
+        # デバッグ出力（DEBUG レベルのときだけ）
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"    🔍 商品 {item_id or 'ID不明'}:")
+            logger.debug(f"      タイトル: {title}")
+            logger.debug(f"      価格: {price}")
+            logger.debug(f"      URL: {url[:50]}..." if url else "URL不明")
+            
+            # デバッグ用：商品要素の一部テキストを表示
+            debug_text = plan.text(item_element)[:200]
+            logger.debug(f"      要素テキスト: {debug_text}...")
+        
+        if as_record:
+            return ItemRecord.from_price_info(
+                title, price_info, url=url, item_id=int(item_id) if item_id else 0,
+                image_url=image_url, shipping=shipping, seller=sys.intern(seller),
+                sold_date=sold_date, scraped_at=int(time.time())
+            )
+        
+        return {
+            'title': title,
+            'price': price,
+            'price_amount': price_info.amount if price_info else None,
+            'currency': price_info.currency if price_info else "",
+            'url': url,
+            'item_id': item_id,
+            'image_url': image_url,
+            'shipping': shipping,
+            'seller': seller,
+            'sold_date': sold_date,
+            'scraped_at': datetime.now().isoformat()
+        }
+    except Exception as e:
+        METRICS.incr('extract_errors')
+        logger.warning(f"⚠️ 商品データ抽出エラー: {e}")
+        return None
+
+# ブロックされたと判断するページの目印（eBay の Bot 判定ページなど）
+_BLOCKED_PAGE_RE = re.compile(r'captcha|pardon our interruption|splashui/challenge', re.IGNORECASE)
+BLOCKED_STATUSES = frozenset({429, 503})
+
+def looks_blocked(response):
+    """
+    レート制限やCAPTCHAページなど、アクセス過多と判断できるレスポンスか
+    """
+    if response.status_code in BLOCKED_STATUSES:
+        return True
+    return response.status_code == 200 and _BLOCKED_PAGE_RE.search(response.text[:20000]) is not None
+
+class HostBudget:
+    """
+    ホスト単位のアクセス予算（同時リクエスト数の上限 + トークンバケットによる速度制限）
+    
+    速度は AIMD で調整する。速い 200 応答ごとに increase ずつ上げ、
+    429/503・CAPTCHAページでは decrease 倍、target_latency を超える遅い応答では
+    slow_decrease 倍に下げる。それ以外の応答（404・5xx など）では変えない。
+    Retry-After があればその間は全スレッドの送信を止める。待ち時間には jitter の割合までランダムな揺らぎを加える。
+    """
+    def __init__(self, max_in_flight=2, rate=0.5, burst=1, min_rate=0.05, max_rate=2.0,
+                 increase=0.05, decrease=0.5, slow_decrease=0.8, target_latency=3.0, jitter=0.25):
+        self.max_in_flight = max_in_flight
+        self.initial_rate = rate
+        self.rate = rate    # 1秒あたりに補充されるトークン数（現在値）
+        self.burst = burst  # バケットの最大トークン数
+        self.min_rate = min_rate
+        self.max_rate = max(max_rate, rate)
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_decrease = slow_decrease
+        self.target_latency = target_latency
+        self.jitter = jitter
+        self._lock = threading.Lock()
+        self._slot_available = threading.Condition(self._lock)
+        self._in_flight = 0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _take_token(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate * (1 + random.uniform(0, self.jitter))
+            _sleep(wait, 'rate_limit')
+
+    @contextmanager
+    def slot(self):
+        """
+        同時実行枠とトークンを1つ確保してリクエストを実行する
+        """
+        with self._slot_available:
+            while self._in_flight >= self.max_in_flight:
+                self._slot_available.wait()
+            self._in_flight += 1
+        try:
+            self._take_token()
+            yield
+        finally:
+            with self._slot_available:
+                self._in_flight -= 1
+                self._slot_available.notify()
+
+    def configure(self, max_in_flight=None, rate=None):
+        """
+        同時リクエスト数の上限と初期速度を変更する（前回と同じ値なら調整済みの速度を引き継ぐ）
+        """
+        with self._slot_available:
+            if max_in_flight is not None and max_in_flight != self.max_in_flight:
+                self.max_in_flight = max_in_flight
+                self._slot_available.notify_all()
+            if rate is not None and rate != self.initial_rate:
+                self.initial_rate = self.rate = rate
+                self.max_rate = max(self.max_rate, rate)
+
+    def record(self, blocked=False, latency=None, retry_after=None, status=200):
+        """
+        応答結果を速度に反映する
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            previous = self.rate
+            if blocked:
+                self.rate = max(self.min_rate, self.rate * self.decrease)
+                self._tokens = min(self._tokens, 0.0)  # 溜まっていた分も使わせない
+                if retry_after:
+                    self._paused_until = max(self._paused_until, now + retry_after)
+                reason = 'blocked'
+            elif latency is not None and latency > self.target_latency:
+                self.rate = max(self.min_rate, self.rate * self.slow_decrease)
+                reason = 'slow'
+            else:
+                # 速度を上げるのは速い 200 応答のときだけ
+                if status == 200:
+                    self.rate = min(self.max_rate, self.rate + self.increase)
+                reason = None
+        
+        if reason:
+            METRICS.incr('throttle_backoffs', reason=reason)
+            logger.info(f"    🐢 アクセス速度を下げます ({reason}): {previous:.2f} → {self.rate:.2f} 回/秒")
+
+    def record_response(self, response, latency=None, retry_after=None):
+        self.record(looks_blocked(response), latency, retry_after, response.status_code)
+
+_host_budgets = {}
+_host_budgets_lock = threading.Lock()
+
+def get_host_budget(url, max_in_flight=None, rate=None, **options):
+    """
+    URLのホストに対応するアクセス予算を取得（同一ホストでは全スレッドで共有）
+    
+    既に作成済みのホストでは既存の予算を返し、max_in_flight / rate を指定した場合は
+    その値を反映する（前回と同じ値なら調整済みの速度を引き継ぐ）。
+    """
+    host = urlparse(url).netloc
+    with _host_budgets_lock:
+        budget = _host_budgets.get(host)
+        if budget is None:
+            limits = {name: value for name, value in (('max_in_flight', max_in_flight), ('rate', rate))
+                      if value is not None}
+            budget = HostBudget(**limits, **options)
+            _host_budgets[host] = budget
+        else:
+            budget.configure(max_in_flight, rate)
+        return budget
+
+def report_host_response(url, response, latency=None, retry_after=None, budgets=None):
+    """
+    予算が作成済みのホストなら、応答結果をその速度調整に反映する
+    
+    budgets（ホスト -> HostBudget）にあるホストは、共有の予算ではなくそちらに反映する。
+    """
+    host = urlparse(url).netloc
+    budget = budgets.get(host) if budgets else None
+    if budget is None:
+        budget = _host_budgets.get(host)
+    if budget is not None:
+        budget.record_response(response, latency, retry_after)
+
+def normalize_url(url):
+    """
+    キャッシュキー用にURLを正規化（スキーム・ホストを小文字化し、クエリパラメータを整列）
+    """
+    parts = urlparse(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunparse((parts.scheme.lower(), parts.netloc.lower(), parts.path or '/', '', query, ''))
+
+class CachedResponse:
+    """
+    キャッシュから復元したレスポンス（requests.Response の一部互換）
+    """
+    def __init__(self, url, status_code, text, headers=None, from_cache=True):
+        self.url = url
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+        self.from_cache = from_cache
+
+    @property
+    def content(self):
+        return self.text.encode('utf-8')
+
+class ResponseCache:
+    """
+    HTTPレスポンスのディスクキャッシュ
+    
+    本文はzlib圧縮して内容のハッシュ名で保存し、正規化URLからの索引をSQLiteで管理する。
+    ttl 秒以内のエントリはそのまま返し、期限切れのものは ETag / Last-Modified で再検証する。
+    圧縮後の合計サイズが max_bytes を超えると最終アクセスが古い順に削除する。
+    offline=True の場合はネットワークに一切アクセスせずキャッシュだけで応答する。
+    """
+    def __init__(self, directory='.http_cache', ttl=3600, max_bytes=512 * 1024 * 1024, offline=False):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = offline
+        self._lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+        self._db = sqlite3.connect(os.path.join(directory, 'index.sqlite3'), check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            ' key TEXT PRIMARY KEY, url TEXT, body_hash TEXT, status INTEGER,'
+            ' etag TEXT, last_modified TEXT, fetched_at REAL, accessed_at REAL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS bodies (body_hash TEXT PRIMARY KEY, size INTEGER)'
+        )
+        self._db.commit()
+
+    def _key(self, url):
+        return hashlib.sha256(normalize_url(url).encode('utf-8')).hexdigest()
+
+    def _body_path(self, body_hash):
+        return os.path.join(self.directory, 'bodies', body_hash[:2], body_hash)
+
+    def lookup(self, url):
+        """
+        キャッシュ済みエントリを返す（なければNone）。戻り値は (レスポンス, 有効期限内か)
+        """
+        key = self._key(url)
+        with self._lock:
+            row = self._db.execute(
+                'SELECT body_hash, status, etag, last_modified, fetched_at FROM entries WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            body_hash, status, etag, last_modified, fetched_at = row
+            try:
+                with open(self._body_path(body_hash), 'rb') as f:
+                    text = zlib.decompress(f.read()).decode('utf-8')
+            except (OSError, zlib.error):
+                self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._db.commit()
+                return None
+            self._db.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (time.time(), key))
+            self._db.commit()
+        
+        headers = {}
+        if etag:
+            headers['ETag'] = etag
+        if last_modified:
+            headers['Last-Modified'] = last_modified
+        fresh = time.time() - fetched_at < self.ttl
+        return CachedResponse(url, status, text, headers), fresh
+
+    def store(self, url, response):
+        """
+        レスポンスを保存し、必要に応じて古いエントリを削除
+        """
+        body = response.text.encode('utf-8')
+        body_hash = hashlib.sha256(body).hexdigest()
+        path = self._body_path(body_hash)
+        now = time.time()
+        key = self._key(url)
+        with self._lock:
+            previous = self._db.execute('SELECT body_hash FROM entries WHERE key = ?', (key,)).fetchone()
+            if not os.path.exists(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                compressed = zlib.compress(body, 6)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, path)
+                self._db.execute('INSERT OR REPLACE INTO bodies VALUES (?, ?)', (body_hash, len(compressed)))
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, normalize_url(url), body_hash, response.status_code,
+                 response.headers.get('ETag'), response.headers.get('Last-Modified'), now, now)
+            )
+            # 内容が変わった場合、前の本文はどこからも参照されなくなっていれば消す
+            if previous is not None and previous[0] != body_hash:
+                self._drop_body_if_unused(previous[0])
+            self._evict()
+            self._db.commit()
+
+    def touch(self, url):
+        """
+        再検証で変更なし(304)だったエントリの取得時刻を更新
+        """
+        with self._lock:
+            now = time.time()
+            self._db.execute(
+                'UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?', (now, now, self._key(url))
+            )
+            self._db.commit()
+
+    def _evict(self):
+        # 最終アクセスが古いエントリから削除し、参照されなくなった本文ファイルも消す
+        total = self._db.execute('SELECT COALESCE(SUM(size), 0) FROM bodies').fetchone()[0]
+        while total > self.max_bytes:
+            row = self._db.execute('SELECT key, body_hash FROM entries ORDER BY accessed_at LIMIT 1').fetchone()
+            if row is None:
+                break
+            key, body_hash = row
+            self._db.execute('DELETE FROM entries WHERE key = ?', (key,))
+            total -= self._drop_body_if_unused(body_hash)
+
+    def _drop_body_if_unused(self, body_hash):
+        """
+        どのエントリからも参照されていない本文を削除し、減ったサイズを返す
+        """
+        if self._db.execute('SELECT 1 FROM entries WHERE body_hash = ?', (body_hash,)).fetchone() is not None:
+            return 0
+        size = self._db.execute('SELECT size FROM bodies WHERE body_hash = ?', (body_hash,)).fetchone()
+        self._db.execute('DELETE FROM bodies WHERE body_hash = ?', (body_hash,))
+        try:
+            os.remove(self._body_path(body_hash))
+        except OSError:
+            pass
+        return size[0] if size else 0
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def cached_get(session, url, cache=None, timeout=15, budget=None):
+    """
+    キャッシュを経由してGETする。budget を渡すとネットワークへのアクセス時だけ枠を確保する
+    """
+    cached = cache.lookup(url) if cache is not None else None
+    
+    if cached is not None:
+        response, fresh = cached
+        if fresh or cache.offline:
+            METRICS.incr('cache_hits')
+            return response
+    elif cache is not None and cache.offline:
+        # オフライン再生でキャッシュにないページは取得できない
+        METRICS.incr('cache_misses', reason='offline')
+        return CachedResponse(url, 504, '')
+    
+    # 期限切れのエントリは条件付きリクエストで再検証
+    headers = {}
+    if cached is not None:
+        if cached[0].headers.get('ETag'):
+            headers['If-None-Match'] = cached[0].headers['ETag']
+        if cached[0].headers.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached[0].headers['Last-Modified']
+    
+    started = None
+    if budget is not None:
+        with budget.slot():
+            started = time.perf_counter()
+            response = session.get(url, timeout=timeout, headers=headers or None)
+    else:
+        started = time.perf_counter()
+        response = session.get(url, timeout=timeout, headers=headers or None)
+    elapsed = time.perf_counter() - started
+    METRICS.observe('fetch_seconds', elapsed)
+    METRICS.incr('http_responses', status=response.status_code)
+    METRICS.incr('bytes_received', len(response.content or b''))
+    
+    blocked = looks_blocked(response)
+    if blocked:
+        METRICS.incr('blocked_responses', status=response.status_code)
+    if budget is not None:
+        # 速度調整には最後の1回の応答時間を使う（リトライの待機時間を「遅い」と数えない）
+        latency = getattr(response, 'attempt_seconds', elapsed)
+        budget.record(blocked, latency, parse_retry_after(response.headers.get('Retry-After')), response.status_code)
+    
+    if cache is None:
+        return response
+    if response.status_code == 304 and cached is not None:
+        cache.touch(url)
+        return cached[0]
+    if response.status_code == 200 and not blocked:
+        cache.store(url, response)
+    return response
+
+def build_search_url(keyword, page):
+    """
+    検索結果ページのURLを組み立てる
+    """
+    # 検索パラメータ
+    params = {
+        '_nkw': keyword,
+        'LH_Sold': '1',  # 売れた商品のみ
+        'LH_Complete': '1',  # 完了した取引のみ
+        '_sop': '13',  # 最近売れた順
+        '_ipg': '60',  # ページあたり60件
+        '_pgn': page
+    }
+    
+    return f"{SEARCH_URL}?{urlencode(params)}"
+
+def fetch_search_page(session, keyword, page, timeout=15, cache=None, budget=None):
+    """
+    検索結果ページを取得してレスポンスを返す（失敗時はNone）
+    """
+    url = build_search_url(keyword, page)
+    response = cached_get(session, url, cache=cache, timeout=timeout, budget=budget)
+    
+    if response.status_code != 200:
+        logger.warning(f"    ❌ エラー: {response.status_code}")
+        return None
+    if looks_blocked(response):
+        logger.warning(f"    ❌ Bot判定ページが返されました: '{keyword}' p{page}")
+        return None
+    
+    return response
+
+def extract_page_items(html, keyword, parser_backend=None, as_record=False, spec=None):
+    """
+    検索結果ページのHTMLから商品データを抽出し、(商品要素数, 商品リスト) を返す
+    
+    spec に FilterSpec を渡すと、条件に合わない商品は抽出の途中で除外する。
+    """
+    plan = get_extraction_plan(parser_backend)
+    
+    # 商品要素を取得（広告や無関係な要素は除外済み）
+    started = time.perf_counter()
+    items = plan.parse_items(html)
+    parsed = time.perf_counter()
+    METRICS.observe('parse_seconds', parsed - started, backend=plan.name)
+    
+    page_items = []
+    if as_record:
+        keyword = sys.intern(keyword)
+        for item in items:
+            record = extract_item_data(item, plan, as_record=True, spec=spec, keyword=keyword)
+            if record and record.title != "タイトル不明":
+                record.keyword = keyword
+                page_items.append(record)
+    else:
+        for item in items:
+            item_data = extract_item_data(item, plan, spec=spec, keyword=keyword)
+            if item_data and item_data['title'] != "タイトル不明":
+                page_items.append({**item_data, 'keyword': keyword})
+    
+    METRICS.observe('extract_seconds', time.perf_counter() - parsed, backend=plan.name)
+    METRICS.incr('pages_parsed')
+    METRICS.incr('items_extracted', len(page_items))
+    return len(items), page_items
+
+def parse_search_page(html, keyword, parser_backend=None, as_record=False, spec=None):
+    """
+    検索結果ページのHTMLから商品データを抽出
+    """
+    found, page_items = extract_page_items(html, keyword, parser_backend, as_record, spec)
+    logger.info(f"    ✅ {found}件の商品を発見")
+    return page_items
+
+# 解析ワーカーから返す商品レコードの項目順
+ITEM_FIELDS = ('title', 'price', 'price_amount', 'currency', 'url', 'item_id', 'image_url', 'shipping', 'seller', 'sold_date', 'scraped_at')
+
+def _parse_page_worker(html, parser_backend, as_record=False, keyword='', spec=None):
+    """
+    解析プロセス側: ページを解析し、商品をタプルの列にして返す（プロセス間の転送量を抑える）
+    
+    このページの解析で記録した計測値も一緒に返し、親プロセスの METRICS に合算させる。
+    """
+    METRICS.reset()
+    found, page_items = extract_page_items(html, keyword, parser_backend, as_record, spec)
+    if as_record:
+        records = [
+            (r.title, r.price_cents, int(r.currency), r.url, r.item_id, r.image_url,
+             r.shipping, r.seller, r.sold_date, r.scraped_at, r.price_amount)
+            for r in page_items
+        ]
+    else:
+        records = [tuple(item[name] for name in ITEM_FIELDS) for item in page_items]
+    return found, records, METRICS.snapshot()
+
+def _record_from_worker(values, keyword):
+    title, price_cents, currency, url, item_id, image_url, shipping, seller, sold_date, scraped_at, price_amount = values
+    return ItemRecord(title, price_cents, Currency(currency), url, item_id, image_url, shipping,
+                      sys.intern(seller), sold_date, scraped_at, keyword, price_amount)
+
+def _fetch_page_task(session, keyword, page, pages, budget, cache=None):
+    """
+    並行モード用: 1ページ分を取得（失敗時はNone）
+    """
+    logger.info(f"  📄 '{keyword}' ページ {page}/{pages}")
+    try:
+        # 通信中だけ予算を確保する（キャッシュ命中時は予算を使わない）
+        return fetch_search_page(session, keyword, page, cache=cache, budget=budget)
+    except Exception as e:
+        logger.warning(f"    ❌ 検索エラー ('{keyword}' p{page}): {e}")
+        return None
+
+class SeenItemIndex:
+    """
+    取得済みの商品IDを記録する永続インデックス（SQLite）
+    
+    定期実行で「最近売れた順」の検索結果を再取得するとき、既知の商品を飛ばすために使う。
+    """
+    def __init__(self, path='seen_items.sqlite3'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('CREATE TABLE IF NOT EXISTS seen (item_id INTEGER PRIMARY KEY, first_seen REAL)')
+        self._db.commit()
+
+    def __contains__(self, item_id):
+        with self._lock:
+            return self._db.execute('SELECT 1 FROM seen WHERE item_id = ?', (int(item_id),)).fetchone() is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._db.execute('SELECT COUNT(*) FROM seen').fetchone()[0]
+
+    def known(self, item_ids):
+        """
+        登録済みのIDの集合を返す（登録はしない）
+        """
+        ids = {int(item_id) for item_id in item_ids}
+        if not ids:
+            return set()
+        with self._lock:
+            placeholders = ','.join('?' * len(ids))
+            return {str(row[0]) for row in self._db.execute(
+                f'SELECT item_id FROM seen WHERE item_id IN ({placeholders})', tuple(ids)
+            )}
+
+    def add(self, item_ids):
+        """
+        IDを登録する（保存先への書き込みが確定した商品だけを渡す）
+        """
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany('INSERT OR IGNORE INTO seen VALUES (?, ?)',
+                                 [(int(item_id), now) for item_id in set(item_ids)])
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def _select_new_items(page_items, seen_index):
+    """
+    ページ内の未取得商品を返す。2つ目の戻り値はページが既知の商品だけだったかどうか
+    
+    ここではIDを登録しない。商品の書き込みが確定してから _mark_seen で登録する。
+    """
+    known = seen_index.known(item['item_id'] for item in page_items if item.get('item_id'))
+    # IDを取り出せない商品は判定できないため常に新規として扱う
+    new_items = [item for item in page_items if not item.get('item_id') or item['item_id'] not in known]
+    exhausted = bool(page_items) and not new_items
+    return new_items, exhausted
+
+def _mark_seen(page_items, seen_index):
+    seen_index.add(item['item_id'] for item in page_items if item.get('item_id'))
+
+class CrawlCheckpoint:
+    """
+    クロールの進捗を追記専用のログ（JSON Lines）に記録し、中断後に続きから再開できるようにする
+    
+    1行目に実行条件（キーワードとページ数）、以降は完了したページごとに1行
+    （そのページで返した商品と、そこでキーワードを打ち切ったか）、最後に完了の行を書く。
+    書き込みは1ページにつき1回の追記と flush（fsync=True なら fsync も）だけで済む。
+    書きかけの最終行は読み込み時に捨てる。メモリには完了したページの番号だけを持ち、
+    商品は記録から返し直すときにログを読み直す。
+    """
+    def __init__(self, path='crawl_checkpoint.jsonl', fsync=True):
+        self.path = path
+        self.fsync = fsync
+        self.keywords = None
+        self.pages = None
+        self.completed = set()  # 完了した (キーワード, ページ)
+        self.stopped_keywords = set()
+        self.finished = False
+        self._valid_bytes = 0  # 正しく読めた行の末尾の位置
+        self._file = None
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                self._valid_bytes += len(line)
+                kind = entry.get('type')
+                if kind == 'run':
+                    self.keywords, self.pages = entry['keywords'], entry['pages']
+                elif kind == 'page':
+                    self.completed.add((entry['keyword'], entry['page']))
+                    if entry.get('stopped'):
+                        self.stopped_keywords.add(entry['keyword'])
+                elif kind == 'done':
+                    self.finished = True
+
+    def can_resume(self, keywords, pages):
+        """
+        未完了の前回の実行と同じ条件か（keywords が空なら前回のキーワードで再開できる）
+        """
+        return (self.keywords is not None and not self.finished and pages == self.pages
+                and (not keywords or list(keywords) == self.keywords))
+
+    def start(self, keywords, pages):
+        """
+        前回と同じ条件なら続きから、それ以外は記録を消して新しく始める
+        """
+        if self.can_resume(keywords, pages):
+            logger.info(f"♻️  チェックポイントから再開: {len(self.completed)}ページ取得済み")
+            self._file = open(self.path, 'r+b')
+            self._file.truncate(self._valid_bytes)  # 書きかけの行を捨てる
+            self._file.seek(self._valid_bytes)
+            return
+        self.keywords, self.pages = list(keywords), pages
+        self.completed = set()
+        self.stopped_keywords = set()
+        self.finished = False
+        self._valid_bytes = 0
+        self._file = open(self.path, 'wb')
+        self._append({'type': 'run', 'keywords': self.keywords, 'pages': pages,
+                      'created_at': datetime.now().isoformat()})
+
+    def _append(self, entry):
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+        self._file.write(line)
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self._valid_bytes += len(line)
+
+    def record_page(self, keyword, page, items, stopped=False):
+        items = [item.to_dict() if isinstance(item, ItemRecord) else item for item in items]
+        self._append({'type': 'page', 'keyword': keyword, 'page': page, 'items': items, 'stopped': stopped})
+        self.completed.add((keyword, page))
+        if stopped:
+            self.stopped_keywords.add(keyword)
+        METRICS.incr('checkpoint_pages')
+
+    def iter_items(self, as_record=False):
+        """
+        完了済みのページの商品を記録順に返す（ログを1行ずつ読み直す）
+        """
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            remaining = self._valid_bytes
+            for line in f:
+                remaining -= len(line)
+                if remaining < 0:
+                    break
+                entry = json.loads(line)
+                if entry.get('type') != 'page':
+                    continue
+                for item in entry['items']:
+                    yield ItemRecord.from_dict(item) if as_record else item
+
+    def pending_pages(self):
+        """
+        まだ記録されていないページ（打ち切ったキーワードの残りのページは除く）
+        """
+        return [(keyword, page) for keyword in self.keywords or () for page in range(1, (self.pages or 0) + 1)
+                if keyword not in self.stopped_keywords and (keyword, page) not in self.completed]
+
+    def finish(self):
+        self._append({'type': 'done'})
+        self.finished = True
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+class ItemDeduplicator:
+    """
+    商品IDによる完全一致の重複除去
+    
+    最初に届いた商品だけを残し、重複して届いた商品の検索キーワードは
+    その商品のキーワード集合にまとめる。IDのない商品は常に残す。
+    """
+    def __init__(self):
+        self._keywords = {}  # 商品ID -> キーワードのリスト（到着順・重複なし）
+        self.duplicates = 0
+
+    def add(self, item):
+        """
+        新しい商品ならTrue、取得済みの商品ならキーワードだけ記録してFalse
+        """
+        item_id = item.get('item_id')
+        if not item_id:
+            return True
+        keyword = item.get('keyword')
+        keywords = self._keywords.get(item_id)
+        if keywords is None:
+            self._keywords[item_id] = [keyword] if keyword else []
+            return True
+        if keyword and keyword not in keywords:
+            keywords.append(keyword)
+        self.duplicates += 1
+        return False
+
+    def iter_unique(self, items):
+        for item in items:
+            if self.add(item):
+                yield item
+
+    def merged_keywords(self):
+        """
+        複数のキーワードで見つかった商品の {商品ID: キーワードのリスト}
+        """
+        return {item_id: list(keywords) for item_id, keywords in self._keywords.items() if len(keywords) > 1}
+
+    def keywords_of(self, item):
+        """
+        商品に付いた検索キーワードの集合（到着順）
+        """
+        item_id = item.get('item_id')
+        if item_id and item_id in self._keywords:
+            return list(self._keywords[item_id])
+        keyword = item.get('keyword')
+        return [keyword] if keyword else []
+
+def set_item_keywords(item, keywords):
+    """
+    商品の keywords（まとめた検索キーワードのリスト）を設定する（辞書・ItemRecord）
+    """
+    if isinstance(item, ItemRecord):
+        item.keywords = keywords
+    else:
+        item['keywords'] = keywords
+
+def attach_keywords(items, keywords_of):
+    """
+    商品に keywords 列（まとめた検索キーワードのリスト）を付ける
+    """
+    for item in items:
+        set_item_keywords(item, keywords_of(item))
+    return items
+
+def dedupe_items(items):
+    """
+    商品IDの重複を除き、重複分の検索キーワードを keywords 列にまとめる
+    """
+    deduplicator = ItemDeduplicator()
+    return attach_keywords(list(deduplicator.iter_unique(items)), deduplicator.keywords_of)
+
+_TITLE_NORMALIZE_RE = re.compile(r'[^0-9a-z\u3040-\u30ff\u4e00-\u9fff]+')
+
+def _title_shingles(titles, size=4):
+    """
+    正規化したタイトルの size バイトずつの窓を整数にし、(窓の値, 各タイトルの先頭の窓の位置) を返す
+    
+    タイトルの境界をまたぐ窓は含めない。size 未満の短いタイトルは空白で埋めて1窓にする。
+    """
+    import numpy as np
+    encoded = [
+        _TITLE_NORMALIZE_RE.sub(' ', str(title or '').lower()).strip().encode('utf-8').ljust(size)
+        for title in titles
+    ]
+    byte_lengths = np.fromiter(map(len, encoded), dtype=np.int64, count=len(encoded))
+    windows = byte_lengths - size + 1
+    byte_starts = np.cumsum(byte_lengths) - byte_lengths
+    offsets = np.cumsum(windows) - windows
+    # 連結したバイト列上での各窓の開始位置
+    positions = np.repeat(byte_starts - offsets, windows) + np.arange(windows.sum())
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.uint64)
+    shingles = np.zeros(len(positions), dtype=np.uint64)
+    for offset in range(size):
+        shingles = (shingles << np.uint64(8)) | data[positions + offset]
+    return shingles, offsets
+
+def minhash_signatures(titles, num_perm=64, shingle_size=4, seed=1, chunk_size=20000):
+    """
+    タイトルのMinHash署名（件数 × num_perm の uint32 配列）
+    
+    ハッシュは乗算シフト法 (a*x + b) >> 32 で、剰余演算を使わずに num_perm 通り計算する。
+    """
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, 2 ** 63, size=num_perm, dtype=np.uint64) | np.uint64(1)
+    b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+    signatures = np.empty((len(titles), num_perm), dtype=np.uint32)
+    for start in range(0, len(titles), chunk_size):
+        shingles, offsets = _title_shingles(titles[start:start + chunk_size], shingle_size)
+        block = signatures[start:start + len(offsets)]
+        for i in range(num_perm):
+            hashed = (shingles * a[i] + b[i]) >> np.uint64(32)
+            block[:, i] = np.minimum.reduceat(hashed, offsets)
+    return signatures
+
+def find_near_duplicates(items, threshold=0.7, price_tolerance=0.1, num_perm=64, bands=16):
+    """
+    タイトルと価格がほぼ同じ商品（再出品など）をまとめ、各商品の代表（最初の商品）の番号を配列で返す
+    
+    MinHash署名を bands 個の帯に分け、いずれかの帯が一致した組だけを候補にする（LSH）。
+    候補は推定Jaccard係数が threshold 以上で、価格の差が price_tolerance の割合以内
+    （両方とも価格不明の場合は価格を問わない）なら重複とみなす。
+    同じ帯に入った商品は価格順に並べて隣どうしだけを比べるため、件数に対してほぼ線形で動く。
+    """
+    import numpy as np
+    items = list(items)
+    count = len(items)
+    parents = np.arange(count)
+    if count < 2:
+        return parents
+    
+    signatures = minhash_signatures([item.get('title', '') for item in items], num_perm)
+    prices = np.array([np.nan if (price := item_price_usd(item)) is None else price for item in items])
+    rows = num_perm // bands
+    
+    left, right = [], []
+    multipliers = (np.arange(rows, dtype=np.uint64) * np.uint64(2) + np.uint64(1)) * np.uint64(0x9E3779B97F4A7C15)
+    for band in range(bands):
+        keys = (signatures[:, band * rows:(band + 1) * rows].astype(np.uint64) * multipliers).sum(axis=1)
+        # 帯の値が同じ商品を価格順（価格不明は末尾）に並べ、隣り合う組を候補にする
+        order = np.lexsort((prices, keys))
+        sorted_keys = keys[order]
+        same = sorted_keys[1:] == sorted_keys[:-1]
+        left.append(order[:-1][same])
+        right.append(order[1:][same])
+    
+    left = np.concatenate(left)
+    right = np.concatenate(right)
+    if not len(left):
+        return parents
+    # 複数の帯で見つかった同じ組を1つにまとめる
+    pairs = np.sort(np.minimum(left, right) * count + np.maximum(left, right))
+    pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+    left, right = np.divmod(pairs, count)
+    
+    similarity = (signatures[left] == signatures[right]).mean(axis=1)
+    price_left, price_right = prices[left], prices[right]
+    both_unknown = np.isnan(price_left) & np.isnan(price_right)
+    price_close = np.abs(price_left - price_right) <= price_tolerance * np.fmax(price_left, price_right)
+    matched = (similarity >= threshold) & (both_unknown | price_close)
+    
+    # 一致した組を Union-Find でまとめる（代表は番号の小さい方）
+    def find(i):
+        while parents[i] != i:
+            parents[i] = parents[parents[i]]
+            i = parents[i]
+        return i
+    
+    for i, j in zip(left[matched].tolist(), right[matched].tolist()):
+        root_i, root_j = find(i), find(j)
+        if root_i != root_j:
+            parents[max(root_i, root_j)] = min(root_i, root_j)
+    return np.array([find(i) for i in range(count)])
+
+def drop_near_duplicates(items, **options):
+    """
+    ほぼ重複した商品のうち最初の1件だけを残す（オプションは find_near_duplicates と同じ）
+    
+    まとめた商品の検索キーワードは残した商品の keywords 列に集める。
+    """
+    items = list(items)
+    representatives = find_near_duplicates(items, **options)
+    merged = {}
+    for item, representative in zip(items, representatives.tolist()):
+        keywords = merged.setdefault(representative, [])
+        for keyword in item.get('keywords') or [item.get('keyword')]:
+            if keyword and keyword not in keywords:
+                keywords.append(keyword)
+    kept = []
+    for index, item in enumerate(items):
+        if representatives[index] == index:
+            set_item_keywords(item, merged[index])
+            kept.append(item)
+    removed = len(items) - len(kept)
+    if removed:
+        METRICS.incr('near_duplicates_removed', removed)
+        logger.info(f"🧹 ほぼ重複した商品を {removed}件 除外しました")
+    return kept
+
+JAPANESE_KEYWORDS = [
+    "japan vintage", "japanese antique", "kimono", "sake", "sushi", "manga", 
+    "anime", "katana", "bonsai", "origami", "zen", "samurai", "geisha",
+    "tokyo", "kyoto", "osaka", "nintendo", "sony", "toyota", "honda"
+]
+
+def _iter_fetched_pages(session, keywords, pages, concurrency, budget, cache, stopped_keywords, completed=()):
+    """
+    検索結果ページを取得し (キーワード, ページ, レスポンス) をキーワード順・ページ順に返す
+    
+    stopped_keywords に入ったキーワードは以降のページを取得しない。
+    completed に含まれる (キーワード, ページ) は取得済みとして飛ばす。
+    """
+    if concurrency > 1:
+        tasks = [(keyword, page) for keyword in keywords for page in range(1, pages + 1)
+                 if (keyword, page) not in completed]
+        logger.info(f"\n🔍 並行検索中: {len(keywords)}キーワード × {pages}ページ (並行数 {concurrency})")
+        
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            # 先行して投入するページ数を制限し、未消費の結果が溜まらないようにする
+            pending = deque()
+            try:
+                for keyword, page in tasks:
+                    if keyword in stopped_keywords:
+                        continue
+                    pending.append((keyword, page, executor.submit(
+                        _fetch_page_task, session, keyword, page, pages, budget, cache
+                    )))
+                    if len(pending) >= concurrency * 2:
+                        keyword, page, future = pending.popleft()
+                        yield keyword, page, future.result()
+                # 投入順に回収して逐次版と同じ並びにする
+                while pending:
+                    keyword, page, future = pending.popleft()
+                    yield keyword, page, future.result()
+            finally:
+                for _, _, future in pending:
+                    future.cancel()
+        return
+    
+    for keyword in keywords:
+        logger.info(f"\n🔍 検索中: '{keyword}'")
+        
+        for page in range(1, pages + 1):
+            if keyword in stopped_keywords:
+                break
+            if (keyword, page) in completed:
+                continue
+            logger.info(f"  📄 ページ {page}/{pages}")
+            
+            try:
+                response = fetch_search_page(session, keyword, page, cache=cache, budget=budget)
+            except Exception as e:
+                logger.warning(f"    ❌ 検索エラー: {e}")
+                continue
+            if response is None:
+                continue
+            
+            yield keyword, page, response
+
+def _iter_parsed_inline(fetched, parser_backend, as_record=False, spec=None):
+    """
+    取得したページをこのプロセス内で解析し (キーワード, ページ, 商品リスト) を返す
+    """
+    for keyword, page, response in fetched:
+        if response is None:
+            continue
+        try:
+            page_items = parse_search_page(response.text, keyword, parser_backend, as_record, spec)
+        except Exception as e:
+            logger.warning(f"    ❌ 解析エラー ('{keyword}' p{page}): {e}")
+            continue
+        yield keyword, page, page_items
+
+def _new_parse_executor(parse_workers):
+    """
+    解析用のプロセスプール
+    """
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    # 取得スレッドが動いている最中に fork すると、ロックを握ったままの状態を子が引き継いで
+    # 止まることがあるため、スレッドを持たないサーバープロセスから起動する
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return ProcessPoolExecutor(max_workers=parse_workers, mp_context=multiprocessing.get_context(method))
+
+def _items_from_worker(keyword, page, future, as_record=False):
+    """
+    解析プロセスの結果を商品リストに戻す（解析に失敗したページは空）
+    """
+    try:
+        found, records, metrics = future.result()
+    except Exception as e:
+        logger.warning(f"    ❌ 解析エラー ('{keyword}' p{page}): {e}")
+        return []
+    METRICS.merge(metrics)
+    logger.info(f"    ✅ '{keyword}' p{page}: {found}件の商品を発見")
+    if as_record:
+        keyword = sys.intern(keyword)
+        return [_record_from_worker(values, keyword) for values in records]
+    return [{**dict(zip(ITEM_FIELDS, record)), 'keyword': keyword} for record in records]
+
+def _iter_parsed_in_processes(fetched, parse_workers, parser_backend, as_record=False, spec=None):
+    """
+    取得したページを解析プロセスに振り分け、結果を投入順（キーワード順・ページ順）に返す
+    
+    解析待ちのページは parse_workers * 2 件までに制限し、それを超えると
+    最も古いページの解析完了を待ってから次を取得する（バックプレッシャー）。
+    中断された場合は未着手の解析を取り消し、実行中のワーカーの終了を待って閉じる。
+    """
+    executor = _new_parse_executor(parse_workers)
+    pending = deque()
+    
+    def collect():
+        keyword, page, future = pending.popleft()
+        return keyword, page, _items_from_worker(keyword, page, future, as_record)
+    
+    try:
+        for keyword, page, response in fetched:
+            if response is None:
+                continue
+            pending.append((keyword, page, executor.submit(
+                _parse_page_worker, response.text, parser_backend, as_record, keyword, spec
+            )))
+            if len(pending) >= parse_workers * 2:
+                yield collect()
+        while pending:
+            yield collect()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _iter_parsed_by_keyword(session, keywords, pages, concurrency, budget, cache, stopped_keywords, completed,
+                            seen_index, parse_workers, parser_backend, as_record=False, spec=None):
+    """
+    並行モード（seen_index あり）用: キーワード単位で並行に取得・解析し (キーワード, ページ, 商品リスト) を返す
+    
+    同じキーワードのページは順に取得し、解析した商品が既知のものだけになったらそのキーワードの
+    次のページは取得しない（打ち切り判定までに先のページを取得しない）。解析結果はそのまま返すので
+    ページを2回解析することはない。parse_workers>0 なら解析はプロセスプールで行う。
+    """
+    executor = _new_parse_executor(parse_workers) if parse_workers > 0 else None
+    
+    def parse(keyword, page, response):
+        if executor is not None:
+            future = executor.submit(_parse_page_worker, response.text, parser_backend, as_record, keyword, spec)
+            return _items_from_worker(keyword, page, future, as_record)
+        try:
+            return parse_search_page(response.text, keyword, parser_backend, as_record, spec)
+        except Exception as e:
+            logger.warning(f"    ❌ 解析エラー ('{keyword}' p{page}): {e}")
+            return []
+    
+    def fetch_keyword(keyword):
+        parsed = []
+        for page in range(1, pages + 1):
+            if (keyword, page) in completed:
+                continue
+            response = _fetch_page_task(session, keyword, page, pages, budget, cache)
+            if response is None:
+                continue
+            page_items = parse(keyword, page, response)
+            parsed.append((page, page_items))
+            if _select_new_items(page_items, seen_index)[1]:
+                break
+        return parsed
+    
+    logger.info(f"\n🔍 並行検索中: {len(keywords)}キーワード × 最大{pages}ページ (並行数 {concurrency})")
+    pending = deque()
+    
+    def drain():
+        keyword, future = pending.popleft()
+        for page, page_items in future.result():
+            if keyword in stopped_keywords:
+                break
+            yield keyword, page, page_items
+    
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as threads:
+            try:
+                for keyword in keywords:
+                    if keyword in stopped_keywords:
+                        continue
+                    pending.append((keyword, threads.submit(fetch_keyword, keyword)))
+                    if len(pending) >= concurrency * 2:
+                        yield from drain()
+                while pending:
+                    yield from drain()
+            finally:
+                for _, future in pending:
+                    future.cancel()
+    finally:
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+def iter_search_items(session, keywords, pages=3, concurrency=1, max_in_flight=2, rate=0.5,
+                      parser_backend=None, cache=None, seen_index=None, parse_workers=0, as_record=False,
+                      spec=None, dedupe=True, checkpoint=None, replay=True, persist=None):
+    """
+    和風商品を検索し、取得できた商品を1件ずつ返すジェネレータ
+    
+    concurrency=1 の場合は従来通り1ページずつ取得する。
+    concurrency>1 の場合はスレッドプールで並行取得する。どちらの場合もホスト単位の予算
+    （同時リクエスト数 max_in_flight、初期速度 毎秒 rate リクエスト）が応答に応じて
+    間隔を調整する。
+    どちらの場合も結果はキーワード順・ページ順に並ぶ。
+    parser_backend には 'lxml'（既定）または 'html.parser' を指定できる。
+    cache に ResponseCache を渡すと取得済みページはキャッシュから読み込み、待機も省略する。
+    seen_index に SeenItemIndex を渡すと未取得の商品だけを返し、既知の商品だけの
+    ページに達した時点でそのキーワードの取得を打ち切る。
+    concurrency>1 で seen_index と併用した場合は、キーワード単位で並行に取得する。
+    parse_workers>0 の場合はHTML解析と商品抽出を指定数のプロセスで並列に行う
+    （concurrency=1 で seen_index と併用すると、打ち切り判定までに先読みしたページは取得される）。
+    as_record=True の場合は辞書の代わりに ItemRecord を返す。
+    spec に FilterSpec を渡すと、条件に合わない商品は抽出の途中で除外して返さない。
+    dedupe=True の場合は商品IDが重複する商品（別キーワード・別ページで再び届いたもの）を
+    返さない。ItemDeduplicator を渡すと、複数回の呼び出しにまたがって重複を除ける。
+    checkpoint に CrawlCheckpoint を渡すと完了したページごとに進捗を記録し、前回が
+    途中で止まっていれば取得済みのページを飛ばして続きから取得する（keywords が空なら
+    前回のキーワードを使う）。取得済みページの商品は replay=True なら先に記録から返す。
+    ページ（と seen_index へのIDの登録）は商品をすべて返し終えてから記録する。persist を
+    渡すと記録の前に呼ぶので、書き込み先の flush を渡せば記録済みの商品は必ずディスクに残る。
+    """
+    if checkpoint is not None and not keywords and checkpoint.can_resume(None, pages):
+        keywords = checkpoint.keywords
+    
+    # キーワードをランダムに選択
+    if not keywords:
+        keywords = random.sample(JAPANESE_KEYWORDS, min(3, len(JAPANESE_KEYWORDS)))
+    
+    budget = get_host_budget(SEARCH_URL, max_in_flight=max_in_flight, rate=rate)
+    if dedupe is True:
+        dedupe = ItemDeduplicator()
+    stopped_keywords = set()
+    completed = set()
+    if checkpoint is not None:
+        checkpoint.start(keywords, pages)
+        stopped_keywords.update(checkpoint.stopped_keywords)
+        completed = set(checkpoint.completed)
+    fetched = _iter_fetched_pages(session, keywords, pages, concurrency, budget, cache, stopped_keywords, completed)
+    
+    if concurrency > 1 and seen_index is not None:
+        parsed = _iter_parsed_by_keyword(session, keywords, pages, concurrency, budget, cache, stopped_keywords,
+                                         completed, seen_index, parse_workers, parser_backend, as_record, spec)
+    elif parse_workers > 0:
+        parsed = _iter_parsed_in_processes(fetched, parse_workers, parser_backend, as_record, spec)
+    else:
+        parsed = _iter_parsed_inline(fetched, parser_backend, as_record, spec)
+    
+    try:
+        if checkpoint is not None:
+            for item in checkpoint.iter_items(as_record):
+                # 記録済みの商品も重複判定に登録しておく
+                if (not dedupe or dedupe.add(item)) and replay:
+                    yield item
+        
+        for keyword, page, page_items in parsed:
+            if keyword in stopped_keywords:
+                continue
+            
+            new_items = page_items
+            if seen_index is not None:
+                page_items, exhausted = _select_new_items(page_items, seen_index)
+                new_items = page_items
+                if exhausted:
+                    logger.info(f"    ⏭️  '{keyword}' は既知の商品のみ → 以降のページを省略")
+                    stopped_keywords.add(keyword)
+            
+            if dedupe:
+                page_items = [item for item in page_items if dedupe.add(item)]
+            yield from page_items
+            
+            # 呼び出し側がページの商品を処理し終えてから、書き込みを確定させて記録する
+            if persist is not None and (checkpoint is not None or seen_index is not None):
+                persist()
+            if checkpoint is not None:
+                checkpoint.record_page(keyword, page, page_items, stopped=keyword in stopped_keywords)
+            if seen_index is not None:
+                _mark_seen(new_items, seen_index)
+        
+        if checkpoint is not None:
+            # 取得に失敗したページが残っていれば完了にせず、次回はそのページから取得し直す
+            pending = checkpoint.pending_pages()
+            if pending:
+                logger.warning(f"⚠️  {len(pending)}ページを取得できませんでした（再実行で続きから取得します）")
+            else:
+                checkpoint.finish()
+    finally:
+        parsed.close()
+        fetched.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+def search_japanese_items(session, keywords, pages=3, near_duplicates=False, **options):
+    """
+    和風商品を検索して取得（オプションは iter_search_items と同じ）
+    
+    商品IDの重複は除き、辞書の商品には届いたすべての検索キーワードを keywords 列にまとめる。
+    near_duplicates=True の場合はタイトルと価格がほぼ同じ商品も除く。
+    """
+    deduplicator = options.pop('dedupe', True)
+    if deduplicator is True:
+        deduplicator = ItemDeduplicator()
+    items = list(iter_search_items(session, keywords, pages, dedupe=deduplicator, **options))
+    if deduplicator:
+        attach_keywords(items, deduplicator.keywords_of)
+    if near_duplicates:
+        items = drop_near_duplicates(items)
+    return items
+
+JAPANESE_INDICATORS = [
+    'japan', 'japanese', 'kimono', 'sake', 'sushi', 'manga', 'anime',
+    'katana', 'bonsai', 'origami', 'zen', 'samurai', 'geisha', 'tokyo',
+    'kyoto', 'osaka', 'vintage', 'antique', 'authentic', 'traditional',
+    'nintendo', 'sony', 'toyota', 'honda', 'mitsubishi', 'panasonic'
+]
+
+@dataclass(frozen=True)
+class FilterSpec:
+    """
+    和風商品の絞り込み条件
+    
+    フィルタと段階的抽出（extract_item_data の spec 引数）の両方がこの述語を使う。
+    """
+    min_price: float = 5.0
+    indicators: tuple = tuple(JAPANESE_INDICATORS)
+    min_title_length: int = 5
+    # 検索キーワードは種類が少ないため判定結果を使い回す
+    _keyword_matches: dict = field(default_factory=dict, init=False, repr=False, compare=False)
+    matcher: KeywordMatcher = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # 照合用の正規表現は作成時に一度だけ組み立てる
+        object.__setattr__(self, 'indicators', tuple(self.indicators))
+        object.__setattr__(self, 'matcher', get_keyword_matcher(self.indicators, word_boundary=True))
+
+    def title_ok(self, title):
+        return bool(title) and title != "タイトル不明" and len(title) >= self.min_title_length
+
+    def keyword_relevant(self, keyword):
+        keyword = keyword.lower()
+        matched = self._keyword_matches.get(keyword)
+        if matched is None:
+            matched = self._keyword_matches[keyword] = self.matcher.search(keyword)
+        return matched
+
+    def is_relevant(self, title, keyword=''):
+        """
+        検索キーワードかタイトルに日本関連の語を含むか
+        """
+        return self.keyword_relevant(keyword) or self.matcher.search(title.lower())
+
+    def price_ok(self, price_usd):
+        """
+        価格が読み取れない商品は除外しない
+        """
+        return price_usd is None or price_usd >= self.min_price
+
+def iter_filter_japanese_items(items, min_price=5.0, indicators=JAPANESE_INDICATORS, spec=None):
+    """
+    条件に合う和風商品だけを1件ずつ返すジェネレータ
+    
+    indicators は語頭一致の正規表現に一度だけまとめてから照合する。
+    spec を渡した場合は min_price と indicators の代わりにその条件を使う。
+    """
+    if spec is None:
+        spec = FilterSpec(min_price, tuple(indicators))
+    matcher = spec.matcher
+    debug_count = 0
+    
+    for item in items:
+        if not item:
+            continue
+            
+        title = item.get('title', '')
+        price_str = item.get('price', '')
+        keyword = item.get('keyword', '').lower()
+        
+        # タイトルが空でないことを確認
+        if not spec.title_ok(title):
+            continue
+        
+        # 日本関連キーワードが含まれているか確認
+        is_japanese = spec.is_relevant(title, keyword)
+        
+        # 価格フィルタ（改良版）
+        has_valid_price = spec.price_ok(item_price_usd(item))
+        
+        # デバッグ出力（最初の5件）
+        if debug_count < 5 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"\n  📋 商品 {debug_count + 1} 詳細:")
+            logger.debug(f"     タイトル: {item.get('title', '')[:80]}...")
+            logger.debug(f"     価格: {price_str}")
+            logger.debug(f"     検索キーワード: {keyword}")
+            logger.debug(f"     タイトル内キーワード: {matcher.matches(title.lower())}")
+            logger.debug(f"     検索キーワード内: {matcher.matches(keyword)}")
+            logger.debug(f"     日本関連判定: {is_japanese}")
+            logger.debug(f"     価格判定: {has_valid_price}")
+            logger.debug(f"     → 追加: {is_japanese and has_valid_price}")
+            debug_count += 1
+        
+        METRICS.incr('filter_checked')
+        if is_japanese and has_valid_price:
+            METRICS.incr('filter_passed')
+            yield item
+
+def filter_japanese_items(items, min_price=5.0, indicators=JAPANESE_INDICATORS, spec=None):
+    """
+    和風商品をフィルタリング（改良版）
+    """
+    logger.info(f"🔍 フィルタリング開始: {len(items)}件の商品を確認")
+    
+    # まず最初の10件の内容を確認
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("\n📋 最初の10件のタイトルと価格確認:")
+        for i, item in enumerate(items[:10], 1):
+            if item:
+                logger.debug(f"  {i}. {item.get('title', '不明')[:60]}... | {item.get('price', '不明')}")
+    
+    filtered_items = list(iter_filter_japanese_items(items, min_price, indicators, spec))
+    
+    logger.info(f"\n✅ フィルタリング完了: {len(filtered_items)}件が条件に合致")
+    return filtered_items
+
+CrawlTask = namedtuple('CrawlTask', ['id', 'run_id', 'keyword', 'page', 'token', 'attempts'])
+
+class CrawlTaskQueue:
+    """
+    分散クロールのタスクキュー兼結果ストア（タスクは キーワード×ページ 単位）
+    
+    ワーカーは lease() で期限付きでタスクを借り、complete() で結果と一緒に返す。
+    期限までに返されなかったタスクは別のワーカーが借り直せるため、落ちたワーカーの分も
+    取りこぼさない。期限切れ後に遅れて届いた結果は貸し出し時の token が一致しないので捨てる。
+    タスクは add_tasks() のたびに新しい実行（run_id）として登録し、結果は実行ごとに取り出す。
+    別の実装（Redis など）に差し替える場合は以下のメソッドを同じ意味で実装する。
+    """
+    def add_tasks(self, keywords, pages):
+        """
+        タスクを新しい実行として登録し、その run_id を返す
+        """
+        raise NotImplementedError
+
+    def lease(self, worker_id, lease_seconds=300):
+        """
+        未処理または期限切れのタスクを1件借りる（なければNone）
+        """
+        raise NotImplementedError
+
+    def complete(self, task, items, stopped=False):
+        """
+        結果を保存してタスクを完了する。借りたままなら True、期限切れで他に渡っていれば False。
+        stopped=True ならそのキーワードの以降のページは取得しない
+        """
+        raise NotImplementedError
+
+    def fail(self, task, error=''):
+        """
+        タスクを返却して再試行に回す（試行回数の上限に達したら失敗として終える）
+        """
+        raise NotImplementedError
+
+    def remaining(self, run_id=None):
+        """
+        まだ終わっていない（未処理・貸出中の）タスク数（run_id が None なら全実行の合計）
+        """
+        raise NotImplementedError
+
+    def latest_run(self):
+        """
+        最後に登録した実行の run_id（なければNone）
+        """
+        raise NotImplementedError
+
+    def iter_results(self, as_record=False, run_id=None):
+        """
+        実行の保存済みの商品を登録順（キーワード順・ページ順）に返す（run_id が None なら最新の実行）
+        """
+        raise NotImplementedError
+
+    def stats(self, run_id=None):
+        raise NotImplementedError
+
+    def reset(self):
+        """
+        すべての実行のタスクと結果を消す
+        """
+        raise NotImplementedError
+
+class SQLiteCrawlQueue(CrawlTaskQueue):
+    """
+    SQLite を使ったタスクキュー（同じマシンの複数プロセスで共有する）
+    
+    貸し出しは BEGIN IMMEDIATE のトランザクション内で行うため、同じタスクが同時に
+    2つのワーカーに渡ることはない。WAL モードにして結果の書き込み中も読み出せるようにする。
+    WAL モードはネットワークファイルシステム上では動かないため、共有ディスクに置いて
+    複数のマシンから使うことはできない（その場合は CrawlTaskQueue の別実装を使う）。
+    """
+    def __init__(self, path='crawl_queue.sqlite3', max_attempts=3, timeout=30):
+        self.path = path
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=timeout, isolation_level=None, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY AUTOINCREMENT, pages INTEGER, created_at REAL)'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS tasks ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT, run_id INTEGER, keyword TEXT, page INTEGER,'
+            " status TEXT DEFAULT 'pending', worker TEXT, token TEXT, lease_expires REAL,"
+            ' attempts INTEGER DEFAULT 0, error TEXT, UNIQUE (run_id, keyword, page))'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS results (task_id INTEGER, seq INTEGER, item TEXT,'
+            ' PRIMARY KEY (task_id, seq))'
+        )
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._db
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def add_tasks(self, keywords, pages):
+        with self._transaction() as db:
+            run_id = db.execute('INSERT INTO runs (pages, created_at) VALUES (?, ?)', (pages, time.time())).lastrowid
+            db.executemany(
+                'INSERT OR IGNORE INTO tasks (run_id, keyword, page) VALUES (?, ?, ?)',
+                [(run_id, keyword, page) for keyword in dict.fromkeys(keywords) for page in range(1, pages + 1)]
+            )
+        return run_id
+
+    def lease(self, worker_id, lease_seconds=300):
+        now = time.time()
+        with self._transaction() as db:
+            # 試行回数を使い切ったまま期限切れになったタスクは失敗として終える
+            db.execute(
+                "UPDATE tasks SET status = 'failed', error = 'lease expired'"
+                " WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts)
+            )
+            row = db.execute(
+                "SELECT id, run_id, keyword, page, attempts FROM tasks"
+                " WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)"
+                " ORDER BY id LIMIT 1", (now,)
+            ).fetchone()
+            if row is None:
+                return None
+            task_id, run_id, keyword, page, attempts = row
+            token = uuid.uuid4().hex
+            db.execute(
+                "UPDATE tasks SET status = 'leased', worker = ?, token = ?, lease_expires = ?,"
+                " attempts = attempts + 1 WHERE id = ?",
+                (worker_id, token, now + lease_seconds, task_id)
+            )
+        if attempts:
+            METRICS.incr('crawl_tasks_retried')
+        return CrawlTask(task_id, run_id, keyword, page, token, attempts + 1)
+
+    def complete(self, task, items, stopped=False):
+        rows = [
+            (task.id, seq, json.dumps(item.to_dict() if isinstance(item, ItemRecord) else item,
+                                      ensure_ascii=False))
+            for seq, item in enumerate(items)
+        ]
+        with self._transaction() as db:
+            updated = db.execute(
+                "UPDATE tasks SET status = 'done', lease_expires = NULL WHERE id = ? AND token = ? AND status = 'leased'",
+                (task.id, task.token)
+            ).rowcount
+            if not updated:
+                return False
+            db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?, ?)', rows)
+            if stopped:
+                db.execute(
+                    "UPDATE tasks SET status = 'skipped'"
+                    " WHERE run_id = ? AND keyword = ? AND page > ? AND status = 'pending'",
+                    (task.run_id, task.keyword, task.page)
+                )
+        return True
+
+    def fail(self, task, error=''):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END,"
+                " error = ?, lease_expires = NULL WHERE id = ? AND token = ? AND status = 'leased'",
+                (self.max_attempts, str(error), task.id, task.token)
+            )
+
+    def remaining(self, run_id=None):
+        query = "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')"
+        with self._lock:
+            if run_id is None:
+                return self._db.execute(query).fetchone()[0]
+            return self._db.execute(query + ' AND run_id = ?', (run_id,)).fetchone()[0]
+
+    def latest_run(self):
+        with self._lock:
+            return self._db.execute('SELECT MAX(id) FROM runs').fetchone()[0]
+
+    def iter_results(self, as_record=False, run_id=None):
+        if run_id is None:
+            run_id = self.latest_run()
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT r.item FROM results r JOIN tasks t ON t.id = r.task_id'
+                ' WHERE t.run_id = ? ORDER BY t.id, r.seq', (run_id,)
+            ).fetchall()
+        for (item,) in rows:
+            item = json.loads(item)
+            yield ItemRecord.from_dict(item) if as_record else item
+
+    def stats(self, run_id=None):
+        if run_id is None:
+            run_id = self.latest_run()
+        with self._lock:
+            counts = dict(self._db.execute(
+                'SELECT status, COUNT(*) FROM tasks WHERE run_id = ? GROUP BY status', (run_id,)
+            ).fetchall())
+            counts['items'] = self._db.execute(
+                'SELECT COUNT(*) FROM results r JOIN tasks t ON t.id = r.task_id WHERE t.run_id = ?', (run_id,)
+            ).fetchone()[0]
+        counts['run_id'] = run_id
+        return counts
+
+    def reset(self):
+        with self._transaction() as db:
+            db.execute('DELETE FROM results')
+            db.execute('DELETE FROM tasks')
+            db.execute('DELETE FROM runs')
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+def distribute_search(task_queue, keywords=None, pages=3):
     """
-    和風商品を検索して取得
+    コーディネーター: 検索をページ単位のタスクに分けて新しい実行として登録し、run_id を返す
+    （keywords が空なら JAPANESE_KEYWORDS 全体）
     """
-    all_items = []
-    
-    japanese_keywords = [
-        "japan vintage", "japanese antique", "kimono", "sake", "sushi", "manga", 
-        "anime", "katana", "bonsai", "origami", "zen", "samurai", "geisha",
-        "tokyo", "kyoto", "osaka", "nintendo", "sony", "toyota", "honda"
-    ]
+    keywords = list(keywords or JAPANESE_KEYWORDS)
+    run_id = task_queue.add_tasks(keywords, pages)
+    logger.info(f"🗂️  分散クロール #{run_id}: {len(keywords)}キーワード × {pages}ページのタスクを登録")
+    return run_id
+
+def run_crawl_worker(task_queue, session=None, worker_id=None, lease_seconds=300, poll_interval=5.0,
+                     max_tasks=None, rate=0.5, max_in_flight=1, parser_backend=None, cache=None,
+                     seen_index=None, spec=None):
+    """
+    ワーカー: キューからタスクを借りて取得・抽出し、結果をキューの結果ストアに送る
     
-    # キーワードをランダムに選択
-    if not keywords:
-        keywords = random.sample(japanese_keywords, min(3, len(japanese_keywords)))
+    セッションとホスト予算はワーカーごとに持つため（セッションはワーカー間で共有しない）、複数のマシンから使えるキュー実装と
+    組み合わせて別のマシン（別のIP）で動かせば、ワーカーの分だけ全体の取得速度が上がる。他のワーカーが借りているタスクしか残って
+    いなければ poll_interval 秒ごとに期限切れを待ち、全タスクが終われば処理件数を返す。
+    """
+    worker_id = worker_id or f"{os.uname().nodename}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    session = session or get_ebay_session(cache)
+    if not session:
+        logger.warning(f"❌ ワーカー {worker_id}: セッション取得失敗")
+        return 0
+    budget = HostBudget(max_in_flight=max_in_flight, rate=rate)
+    if isinstance(session, Transport):
+        # リトライで隠れる 429/503 も共有の予算ではなくこのワーカーの予算に伝える
+        session.host_budgets[urlparse(SEARCH_URL).netloc] = budget
+    processed = 0
     
-    for keyword in keywords:
-        print(f"\n🔍 検索中: '{keyword}'")
+    while max_tasks is None or processed < max_tasks:
+        task = task_queue.lease(worker_id, lease_seconds)
+        if task is None:
+            if not task_queue.remaining():
+                break
+            _sleep(poll_interval, 'lease_wait')
+            continue
         
-        for page in range(1, pages + 1):
-            print(f"  📄 ページ {page}/{pages}")
-            
-            # 検索パラメータ
-            params = {
-                '_nkw': keyword,
-                'LH_Sold': '1',  # 売れた商品のみ
-                'LH_Complete': '1',  # 完了した取引のみ
-                '_sop': '13',  # 最近売れた順
-                '_ipg': '60',  # ページあたり60件
-                '_pgn': page
-            }
-            
-            url = f"https://www.ebay.com/sch/i.html?{urlencode(params)}"
-            
-            try:
-                response = session.get(url, timeout=15)
-                
-                if response.status_code != 200:
-                    print(f"    ❌ エラー: {response.status_code}")
-                    continue
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 商品要素を取得
-                items = soup.select('li[data-view]')
-                
-                # 広告や無関係な要素を除外
-                items = [item for item in items if item.find('a', href=lambda x: x and '/itm/' in x)]
-                
-                print(f"    ✅ {len(items)}件の商品を発見")
-                
-                for item in items:
-                    item_data = extract_item_data(item)
-                    if item_data and item_data['title'] != "タイトル不明":
-                        all_items.append({**item_data, 'keyword': keyword})
-                
-                # Bot検出回避のための待機
-                time.sleep(random.uniform(2, 5))
-                
-            except Exception as e:
-                print(f"    ❌ 検索エラー: {e}")
+        logger.info(f"  📄 [{worker_id}] '{task.keyword}' ページ {task.page} (試行 {task.attempts})")
+        try:
+            response = fetch_search_page(session, task.keyword, task.page, cache=cache, budget=budget)
+            if response is None:
+                # Bot判定などは別のワーカー（別のIP）に回す
+                task_queue.fail(task, 'no response')
+                METRICS.incr('crawl_tasks', status='failed')
                 continue
+            page_items = parse_search_page(response.text, task.keyword, parser_backend, spec=spec)
+            stopped = False
+            if seen_index is not None:
+                page_items, stopped = _select_new_items(page_items, seen_index)
+        except Exception as e:
+            logger.warning(f"    ❌ タスク失敗 ('{task.keyword}' p{task.page}): {e}")
+            task_queue.fail(task, e)
+            METRICS.incr('crawl_tasks', status='failed')
+            continue
+        
+        if task_queue.complete(task, page_items, stopped):
+            METRICS.incr('crawl_tasks', status='done')
+            if seen_index is not None:
+                # 結果ストアに保存できた商品だけを既知にする
+                _mark_seen(page_items, seen_index)
+        else:
+            logger.warning(f"    ⚠️  貸出期限切れのため結果を破棄: '{task.keyword}' p{task.page}")
+            METRICS.incr('crawl_tasks', status='expired')
+        processed += 1
     
-    return all_items
+    logger.info(f"✅ ワーカー {worker_id}: {processed}タスクを処理")
+    return processed
 
-def filter_japanese_items(items, min_price=5.0):
+def collect_crawl_results(task_queue, as_record=False, near_duplicates=False, run_id=None):
     """
-    和風商品をフィルタリング（改良版）
+    コーディネーター: 実行（既定は最新）の商品を集め、search_japanese_items と同じく重複を除いて返す
     """
-    japanese_indicators = [
-        'japan', 'japanese', 'kimono', 'sake', 'sushi', 'manga', 'anime',
-        'katana', 'bonsai', 'origami', 'zen', 'samurai', 'geisha', 'tokyo',
-        'kyoto', 'osaka', 'vintage', 'antique', 'authentic', 'traditional',
-        'nintendo', 'sony', 'toyota', 'honda', 'mitsubishi', 'panasonic'
-    ]
+    deduplicator = ItemDeduplicator()
+    items = [item for item in task_queue.iter_results(as_record, run_id) if deduplicator.add(item)]
+    attach_keywords(items, deduplicator.keywords_of)
+    if near_duplicates:
+        items = drop_near_duplicates(items)
+    return items
+
+# 価格帯分布の区分（スカラーにもNumPy配列にも使える条件式）
+PRICE_RANGES = [
+    ("$1-10", lambda p: (1 <= p) & (p <= 10)),
+    ("$11-50", lambda p: (11 <= p) & (p <= 50)),
+    ("$51-100", lambda p: (51 <= p) & (p <= 100)),
+    ("$101-500", lambda p: (101 <= p) & (p <= 500)),
+    ("$501-1000", lambda p: (501 <= p) & (p <= 1000)),
+    ("$1000+", lambda p: p > 1000)
+]
+
+@dataclass
+class AnalysisReport:
+    """
+    商品分析の結果
+    """
+    total: int = 0
+    priced: int = 0
+    price_unknown: int = 0
+    mean: float = None
+    median: float = None
+    min: float = None
+    max: float = None
+    quantiles: dict = field(default_factory=dict)
+    price_ranges: dict = field(default_factory=dict)
+    keyword_counts: dict = field(default_factory=dict)
+    top_items: list = field(default_factory=list)  # (価格, タイトル) の降順
+
+def _summarize_prices(report, prices, quantiles=(0.25, 0.5, 0.75, 0.9)):
+    """
+    価格の配列から平均・中央値・分位点・価格帯分布をまとめて計算
+    """
+    import numpy as np
+    report.priced = len(prices)
+    if not len(prices):
+        return report
     
-    filtered_items = []
-    debug_count = 0
+    report.mean = float(prices.mean())
+    report.min = float(prices.min())
+    report.max = float(prices.max())
+    # 全体をソートせず、中央の位置だけ部分ソートで求める（従来通り上側の中央値）
+    middle = len(prices) // 2
+    report.median = float(np.partition(prices, middle)[middle])
+    report.quantiles = {q: float(v) for q, v in zip(quantiles, np.quantile(prices, quantiles))}
+    report.price_ranges = {name: int(np.count_nonzero(in_range(prices))) for name, in_range in PRICE_RANGES}
+    return report
+
+def _top_n_indices(prices, n):
+    """
+    価格上位n件のインデックスを降順で返す（部分ソート、同額は先に来た順）
+    """
+    import numpy as np
+    candidates = np.flatnonzero(prices > 0)
+    if len(candidates) > n:
+        threshold = np.partition(prices[candidates], len(candidates) - n)[len(candidates) - n]
+        candidates = candidates[prices[candidates] >= threshold]
+    order = np.lexsort((candidates, -prices[candidates]))
+    return candidates[order][:n]
+
+def _items_to_dataframe(items):
+    """
+    商品（辞書・ItemRecord のリスト、ItemBatch、DataFrame）を DataFrame にする
+    """
+    import pandas as pd
+    if isinstance(items, pd.DataFrame):
+        return items.reset_index(drop=True)
+    if isinstance(items, ItemBatch):
+        return items.to_dataframe()
+    items = list(items)
+    if items and isinstance(items[0], ItemRecord):
+        return ItemBatch(items).to_dataframe()
+    return pd.DataFrame.from_records(items)
+
+def _price_usd_column(df):
+    """
+    米ドル価格の数値列を返す（price_usd 列があればそのまま、なければ price 列の文字列を一括解析）
+    """
+    import numpy as np
+    import pandas as pd
+    if 'price_usd' in df:
+        return pd.to_numeric(df['price_usd'], errors='coerce')
+    if 'price' in df:
+        price_text = df['price'].astype('string')
+        amount_text = price_text.where(price_text != '価格不明').str.extract(r'([\d,]+\.?\d*)', expand=False)
+        return pd.to_numeric(amount_text.str.replace(',', '', regex=False), errors='coerce')
+    return pd.Series(np.nan, index=df.index, dtype='float64')
+
+def build_analysis_report(items, top_n=5, fx=None):
+    """
+    商品を列形式にまとめ、価格の解析から集計までをベクトル演算で行う
     
-    print(f"🔍 フィルタリング開始: {len(items)}件の商品を確認")
+    items には商品辞書・ItemRecord のリスト、ItemBatch、DataFrame を渡せる。
+    数値の price_usd 列があればそれを使い、なければ price 列の文字列を一度だけ解析する。
+    元の金額と通貨（price_amount, currency）がある行は fx（省略時は get_fx_provider()）の
+    販売日のレートで換算し直す（元の金額がない行は従来の米ドル価格のまま）。
+    """
+    import numpy as np
+    import pandas as pd
+    fx = fx if fx is not None else get_fx_provider()
+    df = _items_to_dataframe(items)
+    report = AnalysisReport(total=len(df))
+    if df.empty:
+        return report
     
-    # まず最初の10件の内容を確認
-    print("\n📋 最初の10件のタイトルと価格確認:")
-    for i, item in enumerate(items[:10], 1):
-        if item:
-            print(f"  {i}. {item.get('title', '不明')[:60]}... | {item.get('price', '不明')}")
+    # 価格を一度だけ数値列に変換（価格不明は NaN）
+    price_values = _price_usd_column(df)
+    if 'price_amount' in df and 'currency' in df:
+        days = parse_sold_dates(df['sold_date']) if 'sold_date' in df else None
+        converted = convert_prices_to_usd(df['price_amount'], df['currency'].astype('string'), days, fx)
+        price_values = pd.Series(converted, index=df.index).fillna(price_values)
     
-    for i, item in enumerate(items):
-        if not item:
-            continue
-            
-        title = item.get('title', '').lower()
-        price_str = item.get('price', '')
-        keyword = item.get('keyword', '').lower()
-        
-        # タイトルが空でないことを確認
-        if not title or title == "タイトル不明" or len(title) < 5:
-            continue
-        
-        # 日本関連キーワードが含まれているか確認
-        is_japanese = (
-            any(indicator in title for indicator in japanese_indicators) or
-            any(indicator in keyword for indicator in japanese_indicators)
-        )
-        
-        # 価格フィルタ（改良版）
-        has_valid_price = True
-        if price_str and price_str != "価格不明":
-            # $20.00 のような価格から数値を抽出
-            price_match = re.search(r'[\d,]+\.?\d*', str(price_str))
-            if price_match:
-                try:
-                    price_value = float(price_match.group().replace(',', ''))
-                    has_valid_price = price_value >= min_price
-                except:
-                    has_valid_price = True
-        
-        # デバッグ出力（最初の5件）
-        if debug_count < 5:
-            print(f"\n  📋 商品 {debug_count + 1} 詳細:")
-            print(f"     タイトル: {item.get('title', '')[:80]}...")
-            print(f"     価格: {price_str}")
-            print(f"     検索キーワード: {keyword}")
-            matching_title_keywords = [kw for kw in japanese_indicators if kw in title]
-            matching_search_keywords = [kw for kw in japanese_indicators if kw in keyword]
-            print(f"     タイトル内キーワード: {matching_title_keywords}")
-            print(f"     検索キーワード内: {matching_search_keywords}")
-            print(f"     日本関連判定: {is_japanese}")
-            print(f"     価格判定: {has_valid_price}")
-            print(f"     → 追加: {is_japanese and has_valid_price}")
-            debug_count += 1
-        
-        if is_japanese and has_valid_price:
-            filtered_items.append(item)
+    has_price = price_values.notna().to_numpy()
+    prices = price_values.to_numpy(dtype=np.float64)[has_price]
+    report.price_unknown = report.total - len(prices)
+    _summarize_prices(report, prices)
     
-    print(f"\n✅ フィルタリング完了: {len(filtered_items)}件が条件に合致")
-    return filtered_items
+    keywords = df['keyword'].fillna('unknown') if 'keyword' in df else pd.Series('unknown', index=df.index)
+    counts = keywords.value_counts(sort=False).sort_values(ascending=False, kind='stable')
+    report.keyword_counts = {keyword: int(count) for keyword, count in counts.items()}
+    
+    if len(prices):
+        titles = df['title'].to_numpy()[has_price] if 'title' in df else np.full(len(prices), '')
+        report.top_items = [(float(prices[i]), titles[i]) for i in _top_n_indices(prices, top_n)]
+    
+    return report
 
-def analyze_items(items):
+def print_analysis_report(report):
     """
-    取得した商品を分析
+    分析結果をコンソールに表示
     """
-    if not items:
+    if not report.total:
         print("📊 分析する商品がありません")
         return
     
-    print(f"\n📊 取得商品分析 (総数: {len(items)}件)")
+    print(f"\n📊 取得商品分析 (総数: {report.total}件)")
     print("=" * 50)
     
-    # 価格帯分析
-    prices = []
-    price_unknown_count = 0
-    
-    for item in items:
-        price_str = item.get('price', '価格不明')
-        if price_str == "価格不明":
-            price_unknown_count += 1
-            continue
-            
-        price_match = re.search(r'[\d,]+\.?\d*', price_str)
-        if price_match:
-            try:
-                price = float(price_match.group().replace(',', ''))
-                prices.append(price)
-            except:
-                price_unknown_count += 1
-    
     print(f"💰 価格情報:")
-    print(f"  価格取得済み: {len(prices)}件")
-    print(f"  価格不明: {price_unknown_count}件")
-    
-    if prices:
-        print(f"  平均価格: ${sum(prices)/len(prices):.2f}")
-        print(f"  最高価格: ${max(prices):.2f}")
-        print(f"  最低価格: ${min(prices):.2f}")
-        print(f"  中央値: ${sorted(prices)[len(prices)//2]:.2f}")
-        
-        # 価格帯分布
-        price_ranges = {
-            "$1-10": len([p for p in prices if 1 <= p <= 10]),
-            "$11-50": len([p for p in prices if 11 <= p <= 50]),
-            "$51-100": len([p for p in prices if 51 <= p <= 100]),
-            "$101-500": len([p for p in prices if 101 <= p <= 500]),
-            "$501-1000": len([p for p in prices if 501 <= p <= 1000]),
-            "$1000+": len([p for p in prices if p > 1000])
-        }
+    print(f"  価格取得済み: {report.priced}件")
+    print(f"  価格不明: {report.price_unknown}件")
+    
+    if report.priced:
+        print(f"  平均価格: ${report.mean:.2f}")
+        print(f"  最高価格: ${report.max:.2f}")
+        print(f"  最低価格: ${report.min:.2f}")
+        print(f"  中央値: ${report.median:.2f}")
         
         print(f"\n💎 価格帯分布:")
-        for range_name, count in price_ranges.items():
+        for range_name, count in report.price_ranges.items():
             print(f"  {range_name}: {count}件")
     
-    # 人気キーワード分析
-    keyword_counts = {}
-    for item in items:
-        keyword = item.get('keyword', 'unknown')
-        keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
-    
     print(f"\n🔥 人気検索キーワード:")
-    for keyword, count in sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
+    for keyword, count in sorted(report.keyword_counts.items(), key=lambda x: x[1], reverse=True)[:5]:
         print(f"  {keyword}: {count}件")
     
-    # 高額商品トップ5
-    if prices:
-        items_with_prices = [(item, price) for item, price in zip([item for item in items if item.get('price') != '価格不明'], prices) if price > 0]
-        items_with_prices.sort(key=lambda x: x[1], reverse=True)
-        
+    if report.priced:
         print(f"\n💎 高額商品トップ5:")
-        for i, (item, price) in enumerate(items_with_prices[:5], 1):
-            title = item['title'][:50] + "..." if len(item['title']) > 50 else item['title']
+        for i, (price, title) in enumerate(report.top_items[:5], 1):
+            title = title[:50] + "..." if len(title) > 50 else title
             print(f"  {i}. ${price:.2f} - {title}")
 
+class RunningStats:
+    """
+    商品を1件ずつ受け取りながら集計する（商品そのものは保持しない）
+    
+    中央値のために価格だけは1件8バイトの配列で保持する。
+    価格は fx（省略時は get_fx_provider()）のレートで元の金額から換算する。
+    """
+    def __init__(self, top_n=5, fx=None):
+        self.fx = fx if fx is not None else get_fx_provider()
+        self.count = 0
+        self.price_unknown_count = 0
+        self.prices = array('d')
+        self.keyword_counts = {}
+        self.top_n = top_n
+        self._top = []  # (価格, -到着順, タイトル) の最小ヒープ
+
+    def add(self, item):
+        self.count += 1
+        
+        keyword = item.get('keyword', 'unknown')
+        self.keyword_counts[keyword] = self.keyword_counts.get(keyword, 0) + 1
+        
+        price = item_price_usd(item, self.fx)
+        if price is None:
+            self.price_unknown_count += 1
+            return
+        
+        self.prices.append(price)
+        
+        if price > 0:
+            entry = (price, -self.count, item.get('title', ''))
+            if len(self._top) < self.top_n:
+                heapq.heappush(self._top, entry)
+            elif entry > self._top[0]:
+                heapq.heapreplace(self._top, entry)
+
+    def report(self):
+        """
+        ここまでの集計を AnalysisReport にまとめる
+        """
+        import numpy as np
+        report = AnalysisReport(
+            total=self.count,
+            price_unknown=self.price_unknown_count,
+            keyword_counts=dict(self.keyword_counts),
+            top_items=[(price, title) for price, _, title in sorted(self._top, reverse=True)],
+        )
+        return _summarize_prices(report, np.frombuffer(self.prices, dtype=np.float64))
+
+    def print_report(self):
+        print_analysis_report(self.report())
+
+def analyze_items(items, columnar=False, fx=None):
+    """
+    取得した商品を分析
+    
+    columnar=True の場合は列形式のベクトル演算で集計する（大量の商品向け）。
+    元の通貨の金額は fx（省略時は get_fx_provider()）のレートで換算して集計する。
+    """
+    if columnar:
+        report = build_analysis_report(items, fx=fx)
+    else:
+        stats = RunningStats(fx=fx)
+        for item in items:
+            stats.add(item)
+        report = stats.report()
+    print_analysis_report(report)
+    return report
+
+class CSVItemWriter:
+    """
+    商品を1件ずつCSVに追記する（flush_every 件ごとにディスクへ書き出す）
+    
+    append=True の場合は既存ファイルの末尾に、既存のヘッダーの列順で追記する。
+    """
+    def __init__(self, filename, flush_every=60, append=False):
+        self.filename = filename
+        self.flush_every = flush_every
+        self.count = 0
+        self._writer = None
+        self._fieldnames = None
+        self._rows_start = 0  # この実行で書き込む最初の行のバイト位置
+        if append and os.path.exists(filename) and os.path.getsize(filename) > 0:
+            with open(filename, newline='', encoding='utf-8-sig') as f:
+                self._fieldnames = next(csv.reader(f), None)
+            self._file = open(filename, 'a', newline='', encoding='utf-8')
+            self._rows_start = os.path.getsize(filename)
+        else:
+            self._file = open(filename, 'w', newline='', encoding='utf-8-sig')
+
+    def write(self, item):
+        if self._writer is None:
+            if not self._fieldnames:
+                self._fieldnames = list(item.keys())
+                csv.DictWriter(self._file, fieldnames=self._fieldnames).writeheader()
+                self._file.flush()
+                self._rows_start = self._file.buffer.tell()
+            self._writer = csv.DictWriter(self._file, fieldnames=self._fieldnames, extrasaction='ignore')
+        self._writer.writerow(item)
+        self.count += 1
+        if self.count % self.flush_every == 0:
+            self._file.flush()
+
+    def flush(self):
+        """
+        書き込み済みの行をディスクまで確定させる
+        """
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        self._file.close()
+
+    def update_keywords(self, keywords_by_id):
+        """
+        閉じた後に、この実行で書き込んだ行の keywords 列を {商品ID: キーワードのリスト} で書き換える
+        
+        追記モードでも以前の実行の行は読み書きせず、今回追記した末尾だけを書き直す。
+        """
+        if not keywords_by_id or self._writer is None or 'keywords' not in self._fieldnames:
+            return 0
+        updated = 0
+        with open(self.filename, 'r+', newline='', encoding='utf-8') as f, \
+                tempfile.TemporaryFile('w+', newline='', encoding='utf-8') as rows:
+            f.seek(self._rows_start)
+            writer = csv.DictWriter(rows, fieldnames=self._fieldnames)
+            for row in csv.DictReader(f, fieldnames=self._fieldnames):
+                keywords = keywords_by_id.get(row.get('item_id'))
+                if keywords is not None:
+                    row['keywords'] = str(keywords)
+                    updated += 1
+                writer.writerow(row)
+            rows.seek(0)
+            f.seek(self._rows_start)
+            shutil.copyfileobj(rows, f)
+            f.truncate()
+        return updated
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _item_arrow_schema(pa):
+    """
+    保存用の型付きスキーマ（価格は数値、取得時刻はUTCのタイムスタンプ）
+    """
+    return pa.schema([
+        ('title', pa.string()),
+        ('price_usd', pa.float64()),
+        ('price_amount', pa.float64()),
+        ('currency', pa.dictionary(pa.int8(), pa.string())),
+        ('url', pa.string()),
+        ('item_id', pa.int64()),
+        ('image_url', pa.string()),
+        ('shipping', pa.string()),
+        ('seller', pa.string()),
+        ('sold_date', pa.string()),
+        ('scraped_at', pa.timestamp('s', tz='UTC')),
+        ('keyword', pa.string()),
+        ('keywords', pa.list_(pa.string())),
+        ('scrape_date', pa.date32()),
+    ])
+
+def _items_to_arrow(items, pa):
+    """
+    商品を型付きの Arrow テーブルに変換（scrape_date は取得時刻の現地日付）
+    """
+    import pandas as pd
+    df = _items_to_dataframe(items)
+    columns = {}
+    for name in ('title', 'url', 'image_url', 'shipping', 'seller', 'sold_date', 'keyword'):
+        columns[name] = df[name].astype('string') if name in df else pd.Series(pd.NA, index=df.index, dtype='string')
+    columns['price_usd'] = _price_usd_column(df)
+    columns['price_amount'] = pd.to_numeric(df['price_amount'], errors='coerce') if 'price_amount' in df else pd.Series(float('nan'), index=df.index)
+    currency = df['currency'].astype('string') if 'currency' in df else pd.Series(pd.NA, index=df.index, dtype='string')
+    columns['currency'] = currency.replace('', pd.NA)
+    columns['item_id'] = pd.to_numeric(df['item_id'], errors='coerce').astype('Int64') if 'item_id' in df else pd.Series(pd.NA, index=df.index, dtype='Int64')
+    # まとめた検索キーワードがない行は、その行のキーワードだけのリストにする
+    keywords = df['keywords'] if 'keywords' in df else pd.Series(None, index=df.index, dtype='object')
+    columns['keywords'] = pd.Series([
+        list(value) if isinstance(value, (list, tuple)) else ([keyword] if isinstance(keyword, str) and keyword else [])
+        for value, keyword in zip(keywords, columns['keyword'].fillna(''))
+    ], index=df.index, dtype='object')
+    
+    # 辞書の scraped_at は現地時刻のISO文字列、ItemBatch はUTCのタイムスタンプ
+    local_tz = datetime.now().astimezone().tzinfo
+    scraped_at = pd.to_datetime(df['scraped_at']) if 'scraped_at' in df else pd.Series(pd.Timestamp.now(), index=df.index)
+    if scraped_at.dt.tz is None:
+        scraped_at = scraped_at.dt.tz_localize(local_tz)
+    columns['scraped_at'] = scraped_at.dt.tz_convert('UTC').dt.floor('s')
+    columns['scrape_date'] = scraped_at.dt.tz_convert(local_tz).dt.date
+    
+    schema = _item_arrow_schema(pa)
+    frame = pd.DataFrame(columns)[schema.names]
+    return pa.Table.from_pandas(frame, schema=schema, preserve_index=False)
+
+class ParquetItemWriter:
+    """
+    商品を batch_size 件ごとに行グループとして1つのParquetファイルに追記する（pyarrow が必要）
+    """
+    def __init__(self, filename, batch_size=1000):
+        import pyarrow
+        import pyarrow.parquet
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.filename = filename
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+        self._writer = None
+
+    def write(self, item):
+        self._batch.append(item)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self._flush()
+
+    def flush(self):
+        self._flush()
+
+    def _flush(self):
+        if not self._batch:
+            return
+        table = _items_to_arrow(self._batch, self._pa)
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self.filename, table.schema, compression='zstd')
+        self._writer.write_table(table)
+        self._batch = []
+
+    def close(self):
+        self._flush()
+        if self._writer is not None:
+            self._writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ParquetItemStore:
+    """
+    キーワード・取得日で分割した追記型のParquetデータセット（pyarrow が必要）
+    
+    root/keyword=<キーワード>/scrape_date=<日付>/part-*.parquet の形で保存し、
+    追記のたびに新しいファイルを足すだけで既存のファイルは書き換えない。
+    読み込み時は分割のディレクトリと行グループの統計情報を使って、
+    価格・日付の条件に合わない部分を読まずに済ませる（述語プッシュダウン）。
+    """
+    def __init__(self, root='ebay_items_dataset'):
+        import pyarrow
+        import pyarrow.dataset
+        self._pa = pyarrow
+        self._ds = pyarrow.dataset
+        self.root = root
+        self.schema = _item_arrow_schema(pyarrow)
+        self._partitioning = pyarrow.dataset.partitioning(
+            pyarrow.schema([('keyword', pyarrow.string()), ('scrape_date', pyarrow.date32())]), flavor='hive'
+        )
+        self._format = pyarrow.dataset.ParquetFileFormat()
+
+    def __str__(self):
+        return self.root
+
+    def append(self, items):
+        """
+        商品の一群を新しいファイルとして追加し、追加件数を返す
+        """
+        table = _items_to_arrow(items, self._pa)
+        if not table.num_rows:
+            return 0
+        self._ds.write_dataset(
+            table, self.root, format=self._format, partitioning=self._partitioning,
+            basename_template=f"part-{int(time.time() * 1000)}-{os.getpid()}-{threading.get_ident()}-{{i}}.parquet",
+            existing_data_behavior='overwrite_or_ignore',
+            file_options=self._format.make_write_options(compression='zstd'),
+        )
+        return table.num_rows
+
+    def dataset(self):
+        return self._ds.dataset(self.root, schema=self.schema, format=self._format, partitioning=self._partitioning)
+
+    def _filter(self, keywords=None, min_price=None, max_price=None, since=None, until=None):
+        field = self._ds.field
+        conditions = []
+        if keywords:
+            conditions.append(field('keyword').isin(list(keywords)))
+        if min_price is not None:
+            conditions.append(field('price_usd') >= min_price)
+        if max_price is not None:
+            conditions.append(field('price_usd') <= max_price)
+        if since is not None:
+            conditions.append(field('scrape_date') >= self._pa.scalar(since, self._pa.date32()))
+        if until is not None:
+            conditions.append(field('scrape_date') <= self._pa.scalar(until, self._pa.date32()))
+        expression = None
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def read(self, columns=None, **filters):
+        """
+        条件（keywords, min_price, max_price, since, until）に合う行を DataFrame で読み込む
+        """
+        import pandas as pd
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns or self.schema.names)
+        table = self.dataset().to_table(columns=columns, filter=self._filter(**filters))
+        return table.to_pandas()
+
+    def export_csv(self, filename="ebay_japanese_items.csv", **filters):
+        """
+        互換用: 条件に合う行を従来形式のCSVに書き出す
+        """
+        import pandas as pd
+        df = self.read(**filters).drop(columns=['scrape_date'], errors='ignore')
+        df.insert(1, 'price', df.pop('price_usd').map(lambda p: "価格不明" if pd.isna(p) else f"${p:.2f}"))
+        df.to_csv(filename, index=False, encoding='utf-8-sig')
+        print(f"💾 {len(df)}件の商品を '{filename}' に書き出しました")
+        return len(df)
+
+    def writer(self, batch_size=1000):
+        return DatasetItemWriter(self, batch_size)
+
+class DatasetItemWriter:
+    """
+    ParquetItemStore へ batch_size 件ごとに追記するライター
+    """
+    def __init__(self, store, batch_size=1000):
+        self.store = store
+        self.batch_size = batch_size
+        self.count = 0
+        self._batch = []
+
+    def write(self, item):
+        self._batch.append(item)
+        self.count += 1
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self.store.append(self._batch)
+            self._batch = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_item_writer(filename, append=False):
+    """
+    保存先に応じた逐次書き込み用ライター
+    
+    ParquetItemStore ならデータセットへの追記、.parquet ならParquetファイル、それ以外はCSV。
+    """
+    if isinstance(filename, ParquetItemStore):
+        return filename.writer()
+    if filename.endswith('.parquet'):
+        if append:
+            raise ValueError("Parquetファイルへの追記には対応していません（ParquetItemStore を使用してください）")
+        return ParquetItemWriter(filename)
+    return CSVItemWriter(filename, append=append)
+
+def run_pipeline(session, keywords, pages=3, min_price=5.0, filename="ebay_japanese_items.csv", fx=None,
+                 **search_options):
+    """
+    取得→抽出→フィルタ→集計→保存を1件ずつ流すストリーミング処理
+    
+    商品リストを溜めないため、ページ数が増えてもメモリ使用量はほぼ一定で、
+    クロール中から先頭の行がファイルに書き出される。
+    seen_index を渡した場合は新規の商品だけを既存ファイルに追記する。
+    フィルタ条件は抽出段階にも渡し、除外される商品の残りの項目は抽出しない。
+    checkpoint を渡して中断後に再実行すると、取得済みのページの商品を記録から書き直して
+    続きを取得する（追記モードでは前回書き込み済みのため記録からは書き直さない）。
+    商品は keywords 列付きで書き、後のキーワードで重複して見つかった商品の
+    keywords 列は最後にまとめて書き換える（CSVのみ、追記モードでは今回追記した行だけ）。
+    集計の価格は fx（省略時は get_fx_provider()）のレートで換算する。
+    """
+    stats = RunningStats(fx=fx)
+    spec = FilterSpec(min_price)
+    append = search_options.get('seen_index') is not None
+    search_options.setdefault('replay', not append)
+    deduplicator = search_options.pop('dedupe', True)
+    if deduplicator is True:
+        deduplicator = ItemDeduplicator()
+    with open_item_writer(filename, append=append) as writer:
+        if search_options.get('checkpoint') is not None or append:
+            # ページの記録・既知IDの登録の前に、そのページの行を書き込み先に確定させる
+            search_options.setdefault('persist', writer.flush)
+        items = iter_search_items(session, keywords, pages, spec=spec, dedupe=deduplicator, **search_options)
+        for item in iter_filter_japanese_items(items, spec=spec):
+            if deduplicator:
+                attach_keywords([item], deduplicator.keywords_of)
+            stats.add(item)
+            writer.write(item)
+    if deduplicator and deduplicator.duplicates and hasattr(writer, 'update_keywords'):
+        writer.update_keywords(deduplicator.merged_keywords())
+    
+    print(f"\n✅ フィルタリング完了: {stats.count}件が条件に合致")
+    print(f"💾 {writer.count}件の商品を '{filename}' に保存しました")
+    stats.print_report()
+    return stats
+
 def save_to_csv(items, filename="ebay_japanese_items.csv"):
     """
     CSVファイルに保存
     """
+    import pandas as pd
     if not items:
         print("💾 保存する商品がありません")
         return
     
-    df = pd.DataFrame(items)
+    df = pd.DataFrame([item.to_dict() if isinstance(item, ItemRecord) else item for item in items])
     df.to_csv(filename, index=False, encoding='utf-8-sig')
     print(f"💾 {len(items)}件の商品を '{filename}' に保存しました")
     
@@ -508,6 +3497,413 @@ def save_to_csv(items, filename="ebay_japanese_items.csv"):
     price_with_value = df[df['price'] != '価格不明']
     print(f"  価格取得率: {len(price_with_value)}/{len(items)} ({len(price_with_value)/len(items)*100:.1f}%)")
 
+def save_to_parquet(items, root='ebay_items_dataset'):
+    """
+    キーワード・取得日で分割したParquetデータセットに追記保存
+    """
+    if not items:
+        print("💾 保存する商品がありません")
+        return
+    
+    count = ParquetItemStore(root).append(items)
+    print(f"💾 {count}件の商品を '{root}' に追記しました")
+
+class ScrapeJob:
+    """
+    1件のスクレイピングジョブ（進捗と結果を保持し、結果を待つ読み手に通知する）
+    """
+    def __init__(self, job_id, keywords, pages=2, min_price=5.0):
+        self.id = job_id
+        self.keywords = keywords
+        self.pages = pages
+        self.min_price = min_price
+        self.status = 'queued'
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.items = []
+        self.scanned = 0
+        self.keywords_done = 0
+        self._changed = threading.Condition()
+
+    @property
+    def key(self):
+        """
+        重複判定用のキー（キーワードの順序は問わない）
+        """
+        return tuple(sorted(set(self.keywords))), self.pages, self.min_price
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed')
+
+    def start(self):
+        with self._changed:
+            self.status = 'running'
+            self.started_at = time.time()
+            self._changed.notify_all()
+
+    def count_scanned(self, items):
+        for item in items:
+            self.scanned += 1
+            yield item
+
+    def add_item(self, item):
+        with self._changed:
+            self.items.append(item)
+            self._changed.notify_all()
+
+    def merge_keywords(self, keywords_by_id):
+        """
+        複数のキーワードで見つかった商品の keywords 列をまとめたリストに置き換える
+        """
+        with self._changed:
+            for item in self.items:
+                keywords = keywords_by_id.get(item.get('item_id'))
+                if keywords is not None:
+                    set_item_keywords(item, keywords)
+
+    def keyword_done(self):
+        with self._changed:
+            self.keywords_done += 1
+            self._changed.notify_all()
+
+    def finish(self, error=None):
+        with self._changed:
+            self.status = 'failed' if error else 'done'
+            self.error = error
+            self.finished_at = time.time()
+            self._changed.notify_all()
+
+    def to_dict(self):
+        with self._changed:
+            return {
+                'process_id': self.id,
+                'status': self.status,
+                'error': self.error,
+                'keywords': self.keywords,
+                'pages': self.pages,
+                'min_price': self.min_price,
+                'progress': {
+                    'keywords_done': self.keywords_done,
+                    'keywords_total': len(self.keywords),
+                    'items_scanned': self.scanned,
+                    'items_matched': len(self.items),
+                },
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at,
+            }
+
+    def iter_results(self, start=0, heartbeat=15.0):
+        """
+        start 番目以降の結果を (番号, 商品) で順に返し、ジョブが終わったら止まる
+        
+        新しい結果がないまま heartbeat 秒経つと (None, None) を返す（接続維持用）。
+        """
+        index = start
+        while True:
+            with self._changed:
+                if index >= len(self.items) and not self.finished:
+                    self._changed.wait(heartbeat)
+                new_items = self.items[index:]
+                finished = self.finished
+            if new_items:
+                for offset, item in enumerate(new_items):
+                    yield index + offset, item
+                index += len(new_items)
+            elif finished:
+                return
+            else:
+                yield None, None
+
+class ScrapingService:
+    """
+    スクレイピングジョブの待ち行列とワーカースレッド
+    
+    待ち行列は max_queue 件までで、満杯なら submit() が queue.Full を送出する。
+    同じ条件のジョブが待機中・実行中なら新しく作らずそのジョブを返す。
+    別の条件のジョブどうしでも、同じキーワード（ページ数・最低価格も同じ）の取得が実行中なら
+    取得し直さずにその結果を共有する。
+    ワーカーはセッションを使い回し、session_max_age 秒を過ぎたら作り直す。
+    終了したジョブは新しいものから max_jobs 件まで保持する。
+    """
+    def __init__(self, workers=2, max_queue=16, max_jobs=100, session_max_age=1800, cache=None, **search_options):
+        self.workers = workers
+        self.max_jobs = max_jobs
+        self.session_max_age = session_max_age
+        self.cache = cache
+        self.search_options = search_options
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._jobs = {}    # ジョブID -> ジョブ（登録順）
+        self._active = {}  # 重複判定キー -> 待機中・実行中のジョブ
+        self._keyword_runs = {}  # (キーワード, ページ数, 最低価格) -> 実行中のキーワード単位の取得
+        self._threads = []
+
+    def _start_workers(self):
+        # gunicorn が fork した後のプロセスで起動するよう、最初の登録時まで遅らせる
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._worker, name=f'scrape-worker-{len(self._threads) + 1}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, keywords, pages=2, min_price=5.0):
+        """
+        ジョブを登録して (ジョブ, 新規かどうか) を返す
+        """
+        job = ScrapeJob(uuid.uuid4().hex, list(keywords), pages, min_price)
+        with self._lock:
+            self._start_workers()
+            existing = self._active.get(job.key)
+            if existing is not None and not existing.finished:
+                return existing, False
+            self._queue.put_nowait(job)
+            self._active[job.key] = job
+            self._jobs[job.id] = job
+            self._prune()
+        return job, True
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self._jobs) - self.max_jobs)]:
+            del self._jobs[job_id]
+
+    def _worker(self):
+        session = None
+        session_created = 0.0
+        while True:
+            job = self._queue.get()
+            try:
+                if session is None or time.monotonic() - session_created > self.session_max_age:
+                    session = get_ebay_session(self.cache)
+                    session_created = time.monotonic()
+                if session is None:
+                    raise RuntimeError("セッション取得失敗")
+                self._run(job, session)
+            except Exception as e:
+                logger.warning(f"❌ ジョブ {job.id} が失敗しました: {e}")
+                job.finish(error=str(e))
+                session = None  # 次のジョブではセッションを作り直す
+            finally:
+                with self._lock:
+                    if self._active.get(job.key) is job:
+                        del self._active[job.key]
+                self._queue.task_done()
+
+    def _run(self, job, session):
+        job.start()
+        spec = FilterSpec(job.min_price)
+        deduplicator = ItemDeduplicator()  # キーワードをまたいだ重複を除く
+        for keyword in job.keywords:
+            run, leader = self._keyword_run(keyword, job.pages, job.min_price)
+            if leader:
+                items = self._crawl_keyword(run, session, spec)
+            else:
+                logger.info(f"🔗 ジョブ {job.id}: '{keyword}' は実行中の取得の結果を共有します")
+                METRICS.incr('keyword_crawls_shared')
+                items = self._follow_keyword(run)
+            for item in items:
+                if deduplicator.add(item):
+                    # 共有した商品は他のジョブと別々に keywords 列を付けるため複製する
+                    job.add_item(attach_keywords([copy.copy(item)], deduplicator.keywords_of)[0])
+            job.scanned += run.scanned
+            job.keyword_done()
+        job.merge_keywords(deduplicator.merged_keywords())
+        job.finish()
+        logger.info(f"✅ ジョブ {job.id} 完了: {len(job.items)}件")
+
+    def _keyword_run(self, keyword, pages, min_price):
+        """
+        実行中のキーワード単位の取得を (取得, 自分が取得するか) で返す（なければ新しく作る）
+        """
+        key = (keyword, pages, min_price)
+        with self._lock:
+            run = self._keyword_runs.get(key)
+            if run is not None:
+                return run, False
+            run = self._keyword_runs[key] = ScrapeJob(uuid.uuid4().hex, [keyword], pages, min_price)
+            return run, True
+
+    def _crawl_keyword(self, run, session, spec):
+        """
+        キーワード1件を取得して条件に合う商品を返し、同じ結果を共有する他のジョブにも届ける
+        """
+        key = (run.keywords[0], run.pages, run.min_price)
+        error = "中断されました"
+        run.start()
+        try:
+            items = iter_search_items(session, run.keywords, run.pages, cache=self.cache, spec=spec, **self.search_options)
+            for item in iter_filter_japanese_items(run.count_scanned(items), spec=spec):
+                run.add_item(item)
+                yield item
+            error = None
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            with self._lock:
+                if self._keyword_runs.get(key) is run:
+                    del self._keyword_runs[key]
+            run.finish(error)
+
+    def _follow_keyword(self, run):
+        """
+        他のジョブが実行中のキーワードの取得結果を順に受け取る
+        """
+        for _, item in run.iter_results():
+            if item is not None:
+                yield item
+        if run.error:
+            raise RuntimeError(f"'{run.keywords[0]}' の取得に失敗しました: {run.error}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'workers': len(self._threads),
+                'queued': self._queue.qsize(),
+                'active': len(self._active),
+                'jobs': len(self._jobs),
+            }
+
+# Webサービス（render.yaml の gunicorn app:app から起動）
+app = Flask(__name__)
+CORS(app)
+
+MAX_PAGES_PER_JOB = 10
+
+_scraping_service = None
+_scraping_service_lock = threading.Lock()
+
+def get_scraping_service():
+    """
+    プロセス内で共有するジョブサービス（最初のリクエスト時に作成）
+    """
+    global _scraping_service
+    with _scraping_service_lock:
+        if _scraping_service is None:
+            _scraping_service = ScrapingService(
+                workers=int(os.environ.get('SCRAPER_WORKERS', 2)),
+                max_queue=int(os.environ.get('SCRAPER_MAX_QUEUE', 16)),
+                cache=ResponseCache(ttl=3600),
+            )
+        return _scraping_service
+
+def _error_response(message, status):
+    return jsonify({'status': 'error', 'message': message}), status
+
+def _find_job(process_id):
+    return get_scraping_service().get(process_id)
+
+@app.route('/start_scraping', methods=['POST'])
+def start_scraping():
+    """
+    ジョブを開始して process_id を返す
+    
+    JSON で keywords（省略時は keywords_limit 件をランダムに選択）、pages、min_price を指定できる。
+    """
+    options = request.get_json(silent=True)
+    if options is None:
+        options = {}
+    elif not isinstance(options, dict):
+        return _error_response("JSONオブジェクトで指定してください", 400)
+    try:
+        keywords = options.get('keywords')
+        if keywords is None:
+            limit = min(max(int(options.get('keywords_limit', 3)), 1), len(JAPANESE_KEYWORDS))
+            keywords = random.sample(JAPANESE_KEYWORDS, limit)
+        elif isinstance(keywords, str):
+            keywords = [keywords]
+        elif not isinstance(keywords, list) or not all(isinstance(keyword, str) for keyword in keywords):
+            return _error_response("keywords は文字列または文字列のリストで指定してください", 400)
+        keywords = [str(keyword).strip() for keyword in keywords if str(keyword).strip()]
+        pages = int(options.get('pages', 2))
+        min_price = float(options.get('min_price', 5.0))
+    except (TypeError, ValueError):
+        return _error_response("パラメータが不正です", 400)
+    if not keywords:
+        return _error_response("キーワードが指定されていません", 400)
+    if not 1 <= pages <= MAX_PAGES_PER_JOB:
+        return _error_response(f"pages は1〜{MAX_PAGES_PER_JOB}で指定してください", 400)
+    if not math.isfinite(min_price) or min_price < 0:
+        return _error_response("min_price は0以上の数値で指定してください", 400)
+    
+    try:
+        job, created = get_scraping_service().submit(keywords, pages, min_price)
+    except queue.Full:
+        return _error_response("ジョブが混み合っています。しばらくしてから再実行してください", 503)
+    
+    return jsonify({
+        'status': 'started' if created else 'already_running',
+        'process_id': job.id,
+        'keywords': job.keywords,
+        'status_url': f'/status/{job.id}',
+        'results_url': f'/results/{job.id}',
+        'stream_url': f'/stream/{job.id}',
+    }), 202
+
+@app.route('/status/<process_id>')
+def job_status(process_id):
+    """
+    ジョブの状態と進捗
+    """
+    job = _find_job(process_id)
+    if job is None:
+        return _error_response("ジョブが見つかりません", 404)
+    return jsonify(job.to_dict())
+
+@app.route('/results/<process_id>')
+def job_results(process_id):
+    """
+    ジョブの結果（offset 以降。実行中は途中までの結果）
+    """
+    job = _find_job(process_id)
+    if job is None:
+        return _error_response("ジョブが見つかりません", 404)
+    offset = request.args.get('offset', 0, type=int)
+    if offset < 0:
+        return _error_response("offset は0以上で指定してください", 400)
+    summary = job.to_dict()
+    return jsonify({**summary, 'offset': offset, 'items': job.items[offset:summary['progress']['items_matched']]})
+
+@app.route('/stream/<process_id>')
+def job_stream(process_id):
+    """
+    ジョブの結果を Server-Sent Events で1件ずつ配信し、終了時に done イベントを送る
+    
+    再接続時は Last-Event-ID（または offset）以降の結果から再開する。
+    """
+    job = _find_job(process_id)
+    if job is None:
+        return _error_response("ジョブが見つかりません", 404)
+    last_event_id = request.headers.get('Last-Event-ID', type=int)
+    start = last_event_id + 1 if last_event_id is not None else request.args.get('offset', 0, type=int)
+    if start < 0:
+        return _error_response("offset は0以上で指定してください", 400)
+    
+    def events():
+        for index, item in job.iter_results(start):
+            if item is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"id: {index}\nevent: item\ndata: {json.dumps(item, ensure_ascii=False)}\n\n"
+        yield f"event: done\ndata: {json.dumps(job.to_dict(), ensure_ascii=False)}\n\n"
+    
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/health')
+def health():
+    return jsonify({'status': 'ok', **get_scraping_service().stats()})
+
+@app.route('/metrics')
+def metrics():
+    return Response(METRICS.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
 def main():
     """
     メイン実行
@@ -515,11 +3911,14 @@ def main():
     print("🚀 eBay和風商品スクレイピング開始")
     print("=" * 50)
     
-    # デバッグモード設定（必要に応じて有効化）
-    # extract_price_from_text.debug_mode = True
+    # ログ出力設定（DEBUG にすると商品ごとの詳細も表示）
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    
+    # レスポンスキャッシュ（offline=True にするとキャッシュ済みページだけで再実行）
+    cache = ResponseCache(ttl=3600)
     
     # セッション開始
-    session = get_ebay_session()
+    session = get_ebay_session(cache)
     if not session:
         print("❌ セッション取得失敗")
         return
@@ -527,30 +3926,60 @@ def main():
     # 検索キーワード（カスタマイズ可能）
     custom_keywords = ["japan vintage", "japanese antique"]  # ここを変更可能
     
-    # 商品検索
+    # 為替レート（環境変数 FX_RATES_URL / FX_RATES_FILE があればそこから取得）
+    fx = get_fx_provider()
+    
+    # 商品検索 → 和風商品フィルタリング → 分析 → CSV保存 を1件ずつ流して実行
     print("🔍 商品検索中...")
-    items = search_japanese_items(session, custom_keywords, pages=2)
+    stats = run_pipeline(session, custom_keywords, pages=2, min_price=5.0, fx=fx, cache=cache,
+                         checkpoint=CrawlCheckpoint())
     
-    if not items:
-        print("❌ 商品が見つかりませんでした")
+    if not stats.count:
+        print("❌ 条件に合う商品が見つかりませんでした")
         return
     
-    # 和風商品フィルタリング
-    print("🎌 和風商品フィルタリング中...")
-    filtered_items = filter_japanese_items(items, min_price=5.0)
+    transport_stats = session.stats.summary()
+    if transport_stats['requests']:
+        print(f"📡 通信: {transport_stats['requests']}回 (リトライ {transport_stats['retries']}回, "
+              f"エラー {transport_stats['errors']}回, 中央値 {transport_stats['latency_ms_p50']:.0f}ms)")
     
-    print(f"✅ フィルタリング後: {len(filtered_items)}件")
-    
-    # 分析実行
-    analyze_items(filtered_items)
-    
-    # CSV保存
-    save_to_csv(filtered_items)
+    # 段階ごとの計測値を保存（METRICS.to_prometheus() でテキスト形式も取得可能）
+    METRICS.write_json_lines(METRICS_FILENAME)
+    print(f"⏱️  計測値を {METRICS_FILENAME} に追記しました")
     
     print("\n🎉 スクレイピング完了！")
     
-    return filtered_items
+    return stats
+
+# 分散クロールのキュー（SQLite のため同じマシンのワーカーで共有する）
+CRAWL_QUEUE_PATH = os.environ.get('CRAWL_QUEUE_PATH', 'crawl_queue.sqlite3')
+
+def crawl_main(command, pages=3):
+    """
+    分散クロールの実行（enqueue: 新しい実行としてタスク登録 / worker: ワーカー起動 /
+    collect: 最新の実行の結果の集約とCSV保存 / reset: キューを空にする）
+    """
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    task_queue = SQLiteCrawlQueue(CRAWL_QUEUE_PATH)
+    try:
+        if command == 'enqueue':
+            distribute_search(task_queue, pages=pages)
+        elif command == 'worker':
+            run_crawl_worker(task_queue, spec=FilterSpec())
+        elif command == 'collect':
+            items = filter_japanese_items(collect_crawl_results(task_queue))
+            save_to_csv(items)
+        elif command == 'reset':
+            task_queue.reset()
+        else:
+            print(f"❌ 不明なコマンド: {command}")
+        print(f"🗂️  タスク状況: {task_queue.stats()}")
+    finally:
+        task_queue.close()
 
-# 実行
+# 実行（python app.py enqueue [ページ数] / worker / collect / reset で分散クロール）
 if __name__ == "__main__":
-    result = main()
+    if len(sys.argv) > 1:
+        crawl_main(sys.argv[1], *map(int, sys.argv[2:3]))
+    else:
+        result = main()
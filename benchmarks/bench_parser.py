@@ -0,0 +1,49 @@
+"""
+パーサーバックエンド（BeautifulSoup html.parser / lxml）の比較ベンチマーク
+
+使い方:
+    python benchmarks/bench_parser.py [保存済みページのディレクトリ]
+
+ディレクトリ内の *.html（eBay検索結果ページを保存したもの）を使用する。
+ページがない場合は合成ページで計測する。
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app
+from fixtures import PAGES_DIR, load_pages
+
+def run_backend(backend, pages, repeat):
+    plan = app.get_extraction_plan(backend)
+    results = []
+    started = time.perf_counter()
+    for _ in range(repeat):
+        results = [app.parse_search_page(html, 'bench', backend) for _, html in pages]
+    elapsed = time.perf_counter() - started
+    return elapsed, results
+
+def comparable(results):
+    return [[{k: v for k, v in item.items() if k != 'scraped_at'} for item in page] for page in results]
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else PAGES_DIR
+    pages = load_pages(directory)
+    repeat = 3
+    print(f"📄 {len(pages)}ページ × {repeat}回")
+    baseline = None
+    for backend in ['html.parser', 'lxml']:
+        elapsed, results = run_backend(backend, pages, repeat)
+        items = sum(len(page) for page in results) * repeat
+        per_page = elapsed / (len(pages) * repeat) * 1000
+        print(f"  {backend:12s}: {elapsed:.3f}秒  {per_page:.2f}ms/ページ  {items / elapsed:,.0f}件/秒")
+        if baseline is None:
+            baseline = (elapsed, comparable(results))
+        else:
+            same = comparable(results) == baseline[1]
+            print(f"  速度比: ×{baseline[0] / elapsed:.2f}  抽出結果一致: {same}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+価格抽出のマイクロベンチマークとゴールデン出力チェック
+
+使い方:
+    python benchmarks/bench_price.py
+
+変更前の実装（legacy_price.py）と新しい一括走査版の出力が全入力で一致することを
+確認してから、1回あたりの処理時間を比較する。不一致があれば終了コード1で終了する。
+"""
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from lxml import html as lxml_html
+
+import app
+from fixtures import load_pages, synthetic_price_strings
+from legacy_price import legacy_extract_price_from_text
+
+def item_texts(pages):
+    texts = []
+    for _, html in pages:
+        root = lxml_html.document_fromstring(html.encode('utf-8'))
+        texts.extend(li.text_content() for li in root.iter('li'))
+    return texts
+
+def time_per_call(func, inputs, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for text in inputs:
+            func(text)
+        best = min(best, (time.perf_counter_ns() - started) / len(inputs))
+    return best
+
+def main():
+    inputs = synthetic_price_strings() + item_texts(load_pages(synthetic=5))
+    
+    mismatches = [
+        (text, legacy_extract_price_from_text(text), app.extract_price_from_text(text))
+        for text in inputs
+        if legacy_extract_price_from_text(text) != app.extract_price_from_text(text)
+    ]
+    print(f"🔍 ゴールデン出力チェック: {len(inputs) - len(mismatches)}/{len(inputs)}件一致")
+    for text, expected, actual in mismatches[:10]:
+        print(f"  ❌ {text[:60]!r}: {expected} != {actual}")
+    
+    legacy_ns = time_per_call(legacy_extract_price_from_text, inputs)
+    
+    def cold(text):
+        app._parse_normalized_price.cache_clear()
+        return app.extract_price_from_text(text)
+    
+    cold_ns = time_per_call(cold, inputs)
+    warm_ns = time_per_call(app.extract_price_from_text, inputs)
+    
+    print(f"⏱️  {len(inputs)}件の価格文字列")
+    print(f"  変更前          : {legacy_ns:,.0f} ns/回")
+    print(f"  一括走査(キャッシュなし): {cold_ns:,.0f} ns/回  ×{legacy_ns / cold_ns:.2f}")
+    print(f"  一括走査(キャッシュあり): {warm_ns:,.0f} ns/回  ×{legacy_ns / warm_ns:.2f}")
+    
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+起動時間のベンチマーク
+
+使い方:
+    python benchmarks/bench_startup.py [--runs N]
+
+新しいプロセスで app を import する時間と、最初のセッション用ヘッダー
+（get_stealth_headers）を作るまでの時間を計測する。User-Agent 一覧のキャッシュファイルが
+ない初回起動とある2回目以降の起動、変更前と同じ呼び出しごとの UserAgent() 生成を比較する。
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 子プロセスで import と最初のヘッダー作成の時間を計測し、読み込まれた重いモジュールを報告する
+CHILD = '''
+import json, sys, time
+sys.path.insert(0, {root!r})
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+app.get_stealth_headers()
+headers = time.perf_counter()
+print(json.dumps({{
+    'import': imported - started,
+    'headers': headers - imported,
+    'loaded': [name for name in ('pandas', 'numpy', 'fake_useragent') if name in sys.modules],
+}}))
+'''
+
+def run_child(cwd):
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD.format(root=str(ROOT))],
+        cwd=cwd, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def legacy_headers_seconds(calls=5):
+    """
+    変更前: ヘッダーを作るたびに UserAgent() でデータセットを読み込む
+    """
+    from fake_useragent import UserAgent
+    started = time.perf_counter()
+    for _ in range(calls):
+        UserAgent().chrome
+    return (time.perf_counter() - started) / calls
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        cold = []
+        for _ in range(args.runs):
+            Path(directory, '.ua_cache.json').unlink(missing_ok=True)
+            cold.append(run_child(directory))
+        warm = [run_child(directory) for _ in range(args.runs)]
+
+    def median_ms(results, key):
+        return statistics.median(result[key] for result in results) * 1000
+
+    legacy_ms = legacy_headers_seconds() * 1000
+    print(f"⏱️  起動時間（{args.runs}回の中央値）")
+    print(f"  import app                 : {median_ms(warm, 'import'):7.1f} ms")
+    print(f"  ヘッダー作成（キャッシュなし）: {median_ms(cold, 'headers'):7.1f} ms")
+    print(f"  ヘッダー作成（キャッシュあり）: {median_ms(warm, 'headers'):7.1f} ms")
+    print(f"  変更前（呼び出しごとに生成）: {legacy_ms:7.1f} ms/回")
+    print(f"  読み込まれた重いモジュール（キャッシュあり）: {warm[-1]['loaded'] or 'なし'}")
+
+if __name__ == '__main__':
+    main()
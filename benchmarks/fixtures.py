@@ -0,0 +1,93 @@
+"""
+ベンチマーク用の検索結果ページ（保存済みHTML + 合成ページ）
+"""
+import random
+from pathlib import Path
+
+PAGES_DIR = Path(__file__).parent / 'pages'
+
+_WORDS = (
+    'japan japanese vintage antique kimono sake sushi zen dozen frozen lamp bowl '
+    'tea cup katana anime manga sony honda old rare set lot figure signed'
+).split()
+_PRICES = [
+    ('$', lambda r: f"{r.uniform(0.5, 3000):,.2f}"),
+    ('NT$', lambda r: f"{r.randint(100, 90000):,}"),
+    ('HK$', lambda r: f"{r.uniform(10, 9000):,.2f}"),
+    ('¥', lambda r: f"{r.randint(300, 900000):,}"),
+    ('€', lambda r: f"{r.uniform(1, 2000):,.2f}"),
+    ('£', lambda r: f"{r.uniform(1, 2000):,.2f}"),
+    ('USD ', lambda r: f"{r.uniform(1, 2000):,.2f}"),
+    ('sold for ', lambda r: f"{r.uniform(1, 2000):.2f}"),
+]
+
+def _synthetic_item(r, index):
+    title = ' '.join(r.choice(_WORDS) for _ in range(r.randint(3, 9))).title()
+    if r.random() < 0.1:
+        title = 'New Listing' + title
+    symbol, amount = r.choice(_PRICES)
+    item_id = r.randint(10**11, 10**12 - 1)
+    price_class = r.choice(['s-item__price', 's-item__price', 's-item__detail--primary', 's-item__caption'])
+    return (
+        f'<li data-view="mi:1686|iid:{index}" class="s-item s-item__pl-on-bottom">'
+        f'<div class="s-item__image-section"><img src="https://i.ebayimg.com/images/g/{item_id}/s-l140.jpg"></div>'
+        f'<div class="s-item__info clearfix">'
+        f'<a href="https://www.ebay.com/itm/{item_id}?hash=item{index}" class="s-item__link">'
+        f'<div class="s-item__title"><span role="heading" aria-level="3">{title}</span></div></a>'
+        f'<div class="s-item__details clearfix">'
+        f'<span class="{price_class}"><span class="POSITIVE">{symbol}{amount(r)}</span></span>'
+        f'<span class="s-item__shipping s-item__logisticsCost">+${r.randint(1, 40)}.00 shipping</span>'
+        f'<span class="s-item__seller-info-text">seller_{r.randint(1, 300)} (1,234) 99.{r.randint(0, 9)}%</span>'
+        f'<span class="s-item__caption--signal POSITIVE"><span>Sold  Oct {r.randint(1, 28)}, 2026</span></span>'
+        f'</div></div></li>'
+    )
+
+def synthetic_page(seed=0, items=60):
+    """
+    eBayの検索結果ページを模した合成HTMLを生成（seedが同じなら同じ内容）
+    """
+    r = random.Random(seed)
+    body = ''.join(_synthetic_item(r, i) for i in range(items))
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8"><title>eBay</title></head><body>'
+        '<ul class="srp-results srp-list clearfix">'
+        '<li data-view="mi:1686|iid:ad" class="s-item">Shop on eBay</li>'
+        f'{body}</ul></body></html>'
+    )
+
+def load_pages(directory=PAGES_DIR, synthetic=20):
+    """
+    保存済みの検索結果ページ（*.html）を読み込む。存在しない場合は合成ページを使用
+    """
+    paths = sorted(Path(directory).glob('*.html'))
+    if paths:
+        return [(p.name, p.read_text(encoding='utf-8', errors='replace')) for p in paths]
+    return [(f'synthetic-{seed}', synthetic_page(seed)) for seed in range(synthetic)]
+
+_PRICE_TEMPLATES = [
+    '{sym}{amt}', '{sym} {amt}', '{amt} USD', 'USD {amt}', 'Sold for {amt}', 'price: {amt}',
+    '{sym}{amt} to {sym}{amt2}', 'Was: {sym}{amt2} {sym}{amt}', '{amt}', '+{sym}{amt} shipping',
+    '{sym}{amt} ¥{amt2}', 'HK ${amt}', 'nt${amt}', '{sym}0.00', '{amt} dollars',
+]
+_PRICE_EDGE_CASES = [
+    '', ' ', '価格不明', 'Free shipping', '$', '¥,', ',,,', '$0.50', '¥100', 'NT$10',
+    '€ 1.234,56', '£1,000,000', '$999999', 'USD 3 USD 4', '3 USD 4', '$5 NT$500',
+    '¥3,000 or $20.00', 'Sold  Oct 3, 2026', 'price:\xa012.5', 'sold\nfor\t 45.00',
+    # "au" / "c" で終わる単語の直後の "$" は米ドル（AU $ / C $ と区別する）
+    'Bureau $150', 'Art Nouveau $40', 'Japanese tableau $30', 'Antique Bureau$150.00 shipping',
+    'Zinc $5', 'Vintage Tarpaulin Music $12.50', 'Rare Bronze Deco$99',
+]
+
+def synthetic_price_strings(count=2000, seed=0):
+    """
+    対応する全通貨を含む合成価格文字列（境界ケース込み）
+    """
+    r = random.Random(seed)
+    symbols = ['$', 'NT$', 'HK$', '¥', '€', '£', 'USD ', '']
+    strings = list(_PRICE_EDGE_CASES)
+    while len(strings) < count:
+        template = r.choice(_PRICE_TEMPLATES)
+        amount = r.choice([f"{r.uniform(0.1, 5000):,.2f}", f"{r.randint(1, 2000000):,}", f"{r.uniform(1, 99):.1f}"])
+        amount2 = f"{r.uniform(1, 500):.2f}"
+        strings.append(template.format(sym=r.choice(symbols), amt=amount, amt2=amount2))
+    return strings
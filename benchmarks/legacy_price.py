@@ -0,0 +1,109 @@
+"""
+変更前の extract_price_from_text（ゴールデン出力の比較用に固定したコピー）
+"""
+import re
+
+def legacy_extract_price_from_text(text):
+    """
+    テキストから価格を抽出し、適切な通貨換算を行う改良版関数
+    """
+    if not text:
+        return "価格不明"
+    
+    # 通貨別レート（2024年基準の概算レート）
+    # 実際の運用では為替APIを使用することを推奨
+    rates = {
+        "NT$": 0.032,   # 台湾ドル → USD (1 TWD ≈ 0.032 USD)
+        "HK$": 0.13,    # 香港ドル → USD (1 HKD ≈ 0.13 USD) 
+        "¥": 0.0067,    # 日本円 → USD (1 JPY ≈ 0.0067 USD)
+        "€": 1.08,      # ユーロ → USD (1 EUR ≈ 1.08 USD)
+        "£": 1.25,      # 英ポンド → USD (1 GBP ≈ 1.25 USD)
+        "$": 1.0,       # 米ドル（基準通貨）
+        "USD": 1.0      # 明示的なUSD表記
+    }
+    
+    # 通貨記号付きの価格パターン（優先度順）
+    currency_patterns = [
+        # 台湾ドル（NT$）- eBayでよく見られる
+        r'NT\$\s*([\d,]+(?:\.\d{1,2})?)',
+        # 香港ドル（HK$）
+        r'HK\$\s*([\d,]+(?:\.\d{1,2})?)',
+        # 日本円（¥）
+        r'¥\s*([\d,]+(?:\.\d{1,2})?)',
+        # ユーロ（€）
+        r'€\s*([\d,]+(?:\.\d{1,2})?)',
+        # 英ポンド（£）
+        r'£\s*([\d,]+(?:\.\d{1,2})?)',
+        # 米ドル（$）- 最後に処理（他の通貨と混同を避けるため）
+        r'(?<!NT)(?<!HK)\$\s*([\d,]+(?:\.\d{1,2})?)',
+        # USD明示
+        r'USD\s*([\d,]+(?:\.\d{1,2})?)',
+        r'([\d,]+(?:\.\d{1,2})?)\s*USD'
+    ]
+    
+    # 通貨記号に対応する識別子
+    currency_symbols = ['NT$', 'HK$', '¥', '€', '£', '$', 'USD', 'USD']
+    
+    # 各パターンを試行
+    for i, pattern in enumerate(currency_patterns):
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            try:
+                # 最初にマッチした金額を取得
+                amount_str = matches[0].replace(',', '')
+                amount = float(amount_str)
+                
+                if amount <= 0:
+                    continue
+                
+                # 通貨記号を特定
+                currency = currency_symbols[i]
+                
+                # 米ドルに換算
+                if currency in rates:
+                    usd_amount = amount * rates[currency]
+                else:
+                    # 不明な通貨の場合はそのまま（米ドルと仮定）
+                    usd_amount = amount
+                
+                # デバッグ出力（必要に応じて有効化）
+                debug_mode = getattr(legacy_extract_price_from_text, 'debug_mode', False)
+                if debug_mode:
+                    print(f"    💰 価格変換: {currency}{amount:,} → ${usd_amount:.2f}")
+                
+                # 異常に高額な価格をフィルタリング（50万ドル以上は異常値として扱う）
+                if usd_amount > 500000:
+                    if debug_mode:
+                        print(f"    ⚠️  異常に高額な価格を検出: {currency}{amount:,} (${usd_amount:.2f}) - スキップ")
+                    continue
+                
+                # 異常に安い価格もフィルタリング（1ドル未満）
+                if usd_amount < 1.0:
+                    continue
+                
+                return f"${usd_amount:.2f}"
+                
+            except (ValueError, IndexError):
+                continue
+    
+    # 通貨記号なしの数値パターン（最後の手段）
+    number_only_patterns = [
+        r'sold\s+for\s+([\d,]+\.?\d*)',
+        r'price[:\s]+([\d,]+\.?\d*)',
+        r'([\d,]+\.?\d*)\s*(?:dollars?|usd)?'
+    ]
+    
+    for pattern in number_only_patterns:
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            try:
+                amount_str = matches[0].replace(',', '')
+                amount = float(amount_str)
+                
+                # 妥当な価格範囲かチェック
+                if 1.0 <= amount <= 500000:
+                    return f"${amount:.2f}"
+            except (ValueError, IndexError):
+                continue
+    
+    return "価格不明"
@@ -0,0 +1,200 @@
+"""
+スクレイピング処理のベンチマークスイート（オフライン）
+
+使い方:
+    python benchmarks/run.py                    # 計測してベースラインと比較
+    python benchmarks/run.py --save-baseline    # 計測結果をベースラインとして保存
+    python benchmarks/run.py --pages DIR        # 保存済みの検索結果ページを指定
+
+保存済みページ（既定は benchmarks/pages/*.html、なければ合成ページ）と全通貨の合成価格文字列を使い、
+ページ解析・商品抽出・価格解析・フィルタ・分析の各段階について
+処理速度（ページ/秒・件/秒・ns/回）とピークメモリを計測する。
+ベースライン（benchmarks/baseline.json）より許容率以上に悪化した指標があれば終了コード1で終了する。
+"""
+import argparse
+import json
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import app
+from fixtures import PAGES_DIR, load_pages, synthetic_price_strings
+
+BASELINE_PATH = Path(__file__).parent / 'baseline.json'
+
+def measure(func, repeat=3):
+    """
+    func を repeat 回実行した最短時間（秒）と、1回分のピークメモリ（KB）を返す
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    tracemalloc.start()
+    func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 1024
+
+def bench_pages(pages, results):
+    htmls = [html for _, html in pages]
+    for backend in ['lxml', 'html.parser']:
+        plan = app.get_extraction_plan(backend)
+        seconds, peak = measure(lambda: [plan.parse_items(html) for html in htmls])
+        results[f'parse_html[{backend}].pages_per_s'] = len(htmls) / seconds
+        results[f'parse_html[{backend}].peak_kb'] = peak
+        
+        elements = [element for html in htmls for element in plan.parse_items(html)]
+        seconds, peak = measure(lambda: [app.extract_item_data(element, plan) for element in elements])
+        results[f'extract_item_data[{backend}].items_per_s'] = len(elements) / seconds
+        results[f'extract_item_data[{backend}].peak_kb'] = peak
+        
+        seconds, peak = measure(lambda: [app.parse_search_page(html, 'bench', backend) for html in htmls])
+        results[f'parse_search_page[{backend}].pages_per_s'] = len(htmls) / seconds
+        results[f'parse_search_page[{backend}].items_per_s'] = len(elements) / seconds
+        results[f'parse_search_page[{backend}].peak_kb'] = peak
+        
+        # 絞り込み条件を抽出段階に渡し、除外される商品の残りの項目を抽出しない
+        spec = app.FilterSpec()
+        seconds, peak = measure(lambda: [app.parse_search_page(html, 'bench', backend, spec=spec) for html in htmls])
+        results[f'parse_search_page_staged[{backend}].pages_per_s'] = len(htmls) / seconds
+        results[f'parse_search_page_staged[{backend}].peak_kb'] = peak
+
+def bench_prices(results):
+    strings = synthetic_price_strings(count=5000)
+    by_currency = {}
+    for text in strings:
+        info = app.parse_price(text)
+        by_currency.setdefault(info.currency if info else 'NONE', []).append(text)
+    
+    def parse_all(texts):
+        # キャッシュなしの解析コストを計る
+        app._parse_normalized_price.cache_clear()
+        for text in texts:
+            app.parse_price(text)
+    
+    for currency, texts in sorted(by_currency.items()):
+        seconds, _ = measure(lambda: parse_all(texts), repeat=5)
+        results[f'parse_price[{currency}].ns_per_parse'] = seconds / len(texts) * 1e9
+    seconds, peak = measure(lambda: parse_all(strings), repeat=5)
+    results['parse_price[all].ns_per_parse'] = seconds / len(strings) * 1e9
+    results['parse_price[all].peak_kb'] = peak
+
+def bench_downstream(pages, results, scale=20):
+    dicts = [item for _, html in pages for item in app.parse_search_page(html, 'japan vintage')] * scale
+    records = [item for _, html in pages for item in app.parse_search_page(html, 'japan vintage', as_record=True)] * scale
+    
+    for name, items in [('dict', dicts), ('record', records)]:
+        seconds, peak = measure(lambda: sum(1 for _ in app.iter_filter_japanese_items(items)))
+        results[f'filter[{name}].items_per_s'] = len(items) / seconds
+        results[f'filter[{name}].peak_kb'] = peak
+        
+        def running():
+            stats = app.RunningStats()
+            for item in items:
+                stats.add(item)
+            return stats.report()
+        
+        seconds, peak = measure(running)
+        results[f'analyze_running[{name}].items_per_s'] = len(items) / seconds
+        results[f'analyze_running[{name}].peak_kb'] = peak
+        
+        # 元の通貨の金額を既定の為替レートで一括換算し直して集計する
+        seconds, peak = measure(lambda: app.build_analysis_report(items))
+        results[f'analyze_columnar[{name}].items_per_s'] = len(items) / seconds
+        results[f'analyze_columnar[{name}].peak_kb'] = peak
+        
+        # scale 倍に複製した商品は同じIDなので、重複除去の対象になる
+        seconds, peak = measure(lambda: sum(1 for _ in app.ItemDeduplicator().iter_unique(items)))
+        results[f'dedupe_exact[{name}].items_per_s'] = len(items) / seconds
+        results[f'dedupe_exact[{name}].peak_kb'] = peak
+        
+        seconds, peak = measure(lambda: app.find_near_duplicates(items), repeat=1)
+        results[f'dedupe_near[{name}].items_per_s'] = len(items) / seconds
+        results[f'dedupe_near[{name}].peak_kb'] = peak
+
+# ほぼ重複の判定の確認用: (商品の (タイトル, 価格) の列, 期待する代表の番号)
+NEAR_DUPLICATE_CASES = [
+    # 同じ帯の先頭（$100）とは価格が合わなくても、$500 どうしは重複
+    ([('Vintage Japanese Imari Porcelain Plate Blue White', 100.0),
+      ('Vintage Japanese Imari Porcelain Plate Blue White', 500.0),
+      ('Vintage Japanese Imari Porcelain Plate Blue White', 500.0),
+      ('Sony Walkman Cassette Player', 20.0)], [0, 1, 1, 3]),
+    ([('Japanese Kimono Silk Obi Belt Gold Crane', 80.0),
+      ('Japanese Kimono Silk Obi Belt Gold Crane', 84.0),
+      ('Japanese Kimono Silk Obi Belt Gold Crane', 300.0),
+      ('Japanese Kimono Silk Obi Belt Gold Crane', 310.0)], [0, 0, 2, 2]),
+]
+
+def check_near_duplicates():
+    """
+    find_near_duplicates の結果が期待通りか確認し、不一致の件数を返す
+    """
+    failures = 0
+    for products, expected in NEAR_DUPLICATE_CASES:
+        items = [{'title': title, 'price': f"${price:.2f}", 'item_id': str(i + 1)}
+                 for i, (title, price) in enumerate(products)]
+        actual = app.find_near_duplicates(items).tolist()
+        if actual != expected:
+            failures += 1
+            print(f"  ❌ {[price for _, price in products]}: {actual} != {expected}")
+    print(f"🔍 ほぼ重複の判定チェック: {len(NEAR_DUPLICATE_CASES) - failures}/{len(NEAR_DUPLICATE_CASES)}件一致")
+    return failures
+
+def is_regression(metric, value, baseline, tolerance):
+    # 件/秒・ページ/秒は大きいほど良く、ns・メモリは小さいほど良い
+    if metric.endswith('_per_s'):
+        return value < baseline * (1 - tolerance)
+    return value > baseline * (1 + tolerance)
+
+def main():
+    parser = argparse.ArgumentParser(description='スクレイピング処理のベンチマーク')
+    parser.add_argument('--pages', default=PAGES_DIR, help='保存済み検索結果ページのディレクトリ')
+    parser.add_argument('--baseline', default=BASELINE_PATH, type=Path)
+    parser.add_argument('--save-baseline', action='store_true', help='今回の結果をベースラインとして保存')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='許容する悪化率（既定 25%%）')
+    parser.add_argument('--json', type=Path, help='結果をJSONで保存するパス')
+    args = parser.parse_args()
+    
+    pages = load_pages(args.pages)
+    if check_near_duplicates():
+        sys.exit(1)
+    
+    results = {}
+    bench_pages(pages, results)
+    bench_prices(results)
+    bench_downstream(pages, results)
+    
+    baseline = json.loads(args.baseline.read_text()) if args.baseline.exists() else {}
+    regressions = []
+    print(f"📄 {len(pages)}ページで計測")
+    print(f"{'指標':52s} {'今回':>14s} {'ベースライン':>14s}")
+    for metric, value in results.items():
+        base = baseline.get(metric)
+        mark = ''
+        if base is not None and is_regression(metric, value, base, args.tolerance):
+            regressions.append(metric)
+            mark = '  ❌ 悪化'
+        base_text = f"{base:14,.1f}" if base is not None else f"{'-':>14s}"
+        print(f"{metric:52s} {value:14,.1f} {base_text}{mark}")
+    
+    if args.json:
+        args.json.write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True))
+        print(f"💾 ベースラインを保存しました: {args.baseline}")
+        return
+    if not baseline:
+        print("ℹ️  ベースラインがありません（--save-baseline で保存できます）")
+    elif regressions:
+        print(f"\n❌ {len(regressions)}個の指標が {args.tolerance:.0%} 以上悪化しました")
+        sys.exit(1)
+    else:
+        print("\n✅ ベースラインからの悪化はありません")
+
+if __name__ == "__main__":
+    main()